@@ -0,0 +1,148 @@
+import os
+import struct
+from array import array
+from datetime import datetime
+
+import instrument
+import main
+from word_index import ALPHABET, WORD_IDS, letter_mask
+
+# Layout: HEADER, then one RECORD per puzzle followed by its word ids as little-endian uint32s.
+# Word ids index into a sidecar word table (one word per line) that is only ever appended to.
+MAGIC = b'SBPZ'
+# Version 2 added the sbsolver puzzle id to every record
+VERSION = 2
+HEADER = struct.Struct('<4sHI')  # magic, version, record count
+# sbsolver puzzle id (0 if unknown), date ordinal (0 if unknown), key letter index, letter mask, word count
+RECORD = struct.Struct('<IiBIH')
+WORD_ID_SIZE = 4
+FIELDS = ('puzzle_id', 'date', 'key_letter', 'mask', 'word_ids', 'words')
+
+
+def words_path(filepath):
+    return os.path.splitext(filepath)[0] + '-words.txt'
+
+
+class WordTable:
+    """Append-only list of every word that appears in the archive; a word's id is its line number."""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.words = []
+        if os.path.exists(filepath):
+            with open(filepath, 'r') as infile:
+                self.words = [w.strip() for w in infile]
+        self.ids = {w: i for i, w in enumerate(self.words)}
+        self.n_saved = len(self.words)
+
+    def id_of(self, word):
+        if word not in self.ids:
+            self.ids[word] = len(self.words)
+            self.words.append(word)
+        return self.ids[word]
+
+    def save(self):
+        with open(self.filepath, 'a') as outfile:
+            outfile.writelines(w + '\n' for w in self.words[self.n_saved:])
+        self.n_saved = len(self.words)
+
+
+def read_header(infile):
+    magic, version, count = HEADER.unpack(infile.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"'{infile.name}' is not a puzzle archive")
+    if version != VERSION:
+        raise ValueError(f"Puzzle archive version {version} is not supported (expected {VERSION})")
+    return count
+
+
+def count_records(filepath):
+    with open(filepath, 'rb') as infile:
+        return read_header(infile)
+
+
+# False for archives written by an older version, which have to be rebuilt rather than read
+def is_current(filepath):
+    with open(filepath, 'rb') as infile:
+        magic, version, _ = HEADER.unpack(infile.read(HEADER.size))
+    return magic == MAGIC and version == VERSION
+
+
+def encode_record(puzzle, table):
+    word_ids = [table.id_of(w) for w in puzzle.all_words]
+    date = puzzle.date.toordinal() if puzzle.date else 0
+    # Puzzles decoded from the legacy jsonpickle archive never had the attribute set
+    puzzle_id = getattr(puzzle, 'puzzle_id', None) or 0
+    header = RECORD.pack(puzzle_id, date, ALPHABET.index(puzzle.key_letter), puzzle.mask(), len(word_ids))
+    return header + struct.pack(f'<{len(word_ids)}I', *word_ids)
+
+
+def save_archive(puzzles, filepath):
+    for path in (filepath, words_path(filepath)):
+        if os.path.exists(path):
+            os.remove(path)
+    append_archive(puzzles, filepath)
+
+
+# Writes the new records at the end of the file and only rewrites the record count in the header
+def append_archive(puzzles, filepath):
+    table = WordTable(words_path(filepath))
+    records = b''.join(encode_record(p, table) for p in puzzles)
+    table.save()
+    if not os.path.exists(filepath):
+        with open(filepath, 'wb') as outfile:
+            outfile.write(HEADER.pack(MAGIC, VERSION, 0))
+    with open(filepath, 'r+b') as outfile:
+        count = read_header(outfile)
+        outfile.seek(0, os.SEEK_END)
+        outfile.write(records)
+        outfile.seek(0)
+        outfile.write(HEADER.pack(MAGIC, VERSION, count + len(puzzles)))
+
+
+# Lazily yields one dict per puzzle holding only `fields`; word lists are skipped over unless asked for
+def iter_records(filepath, fields=FIELDS):
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown archive fields: {', '.join(sorted(unknown))}")
+    words = WordTable(words_path(filepath)).words if 'words' in fields else None
+    read_ids = 'words' in fields or 'word_ids' in fields
+    with open(filepath, 'rb') as infile:
+        for _ in range(read_header(infile)):
+            puzzle_id, date, key_index, mask, n_words = RECORD.unpack(infile.read(RECORD.size))
+            record = {}
+            if 'puzzle_id' in fields:
+                record['puzzle_id'] = puzzle_id or None
+            if 'date' in fields:
+                record['date'] = datetime.fromordinal(date) if date else None
+            if 'key_letter' in fields:
+                record['key_letter'] = ALPHABET[key_index]
+            if 'mask' in fields:
+                record['mask'] = mask
+            if read_ids:
+                word_ids = struct.unpack(f'<{n_words}I', infile.read(n_words * WORD_ID_SIZE))
+                if 'word_ids' in fields:
+                    record['word_ids'] = word_ids
+                if 'words' in fields:
+                    record['words'] = [words[i] for i in word_ids]
+            else:
+                infile.seek(n_words * WORD_ID_SIZE, os.SEEK_CUR)
+            yield record
+
+
+@instrument.timed('decode.archive')
+def load_puzzles(filepath):
+    words = WordTable(words_path(filepath)).words
+    # Once per distinct word rather than once per answer
+    word_masks = [letter_mask(w) for w in words]
+    shared_ids = WORD_IDS.ids_of(words)
+    puzzles = []
+    for record in iter_records(filepath, ('puzzle_id', 'date', 'key_letter', 'mask', 'word_ids')):
+        puzzle = main.Puzzle(record['key_letter'])
+        puzzle.letter_mask = record['mask']
+        puzzle.date = record['date']
+        puzzle.puzzle_id = record['puzzle_id']
+        puzzle.word_ids = array('I', [shared_ids[i] for i in record['word_ids']])
+        puzzle.pangram_ids = array('I', [shared_ids[i] for i in record['word_ids'] if word_masks[i] == record['mask']])
+        puzzles.append(puzzle)
+    return puzzles
@@ -0,0 +1,56 @@
+import numpy as np
+
+import instrument
+from word_index import LETTER_BITS, letter_mask
+
+# Puzzles per vectorized step; each step allocates CHUNK_SIZE x n_words booleans
+CHUNK_SIZE = 64
+
+
+class BatchSolver:
+    """Solves many puzzles against one dictionary at once.
+
+    Every word is reduced to its letter mask up front, then each chunk of puzzles is matched
+    against all words with a single broadcasted bitwise subset test. Solutions are arrays of
+    indices into `self.words`.
+    """
+
+    def __init__(self, words):
+        self.words = list(words)
+        self.ids = {w: i for i, w in enumerate(self.words)}
+        self.masks = np.array([letter_mask(w) for w in self.words], dtype=np.uint32)
+        # Words with more than 7 distinct letters can never be an answer
+        n_letters = np.array([len(set(w)) for w in self.words], dtype=np.uint8)
+        self.candidates = np.flatnonzero(n_letters <= 7)
+        self.candidate_masks = self.masks[self.candidates]
+
+    def __len__(self):
+        return len(self.words)
+
+    # `pairs` are (key letter, letters) tuples, same as Puzzle.of
+    @instrument.timed('solve.batch')
+    def solve(self, pairs):
+        pairs = list(pairs)
+        key_bits = np.array([LETTER_BITS[k] for k, _ in pairs], dtype=np.uint32)
+        puzzle_masks = np.array([letter_mask(letters) | LETTER_BITS[k] for k, letters in pairs], dtype=np.uint32)
+        ret = []
+        for start in range(0, len(pairs), CHUNK_SIZE):
+            keys = key_bits[start:start + CHUNK_SIZE, None]
+            outside = ~puzzle_masks[start:start + CHUNK_SIZE, None]
+            fits = ((self.candidate_masks & outside) == 0) & ((self.candidate_masks & keys) != 0)
+            ret.extend(self.candidates[np.flatnonzero(row)] for row in fits)
+        return ret
+
+    def pangrams(self, word_ids, letters):
+        return word_ids[self.masks[word_ids] == letter_mask(letters)]
+
+    def get_words(self, word_ids):
+        return [self.words[i] for i in word_ids]
+
+    def solve_puzzles(self, puzzles):
+        puzzles = list(puzzles)
+        solves = self.solve((p.key_letter, p.all_letters()) for p in puzzles)
+        for puzzle, word_ids in zip(puzzles, solves):
+            puzzle.all_words = self.get_words(word_ids)
+            puzzle.all_pangrams = self.get_words(self.pangrams(word_ids, puzzle.all_letters()))
+        return puzzles
@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import archive
+import cache
+import util
+from batch import BatchSolver
+from binary_dictionary import BinaryDictionary, save_binary_dictionary
+from main import Puzzle, get_puzzles
+from word_index import WordIndex, letter_mask, mask_letters
+
+# Modules behind the CLI entry points (solve_today, solve_with_pokedex, ...)
+ENTRY_MODULES = ['main', 'cache', 'scraper', 'space']
+# Generous ceiling; the point is to catch a heavy import sneaking back in at module level
+MAX_IMPORT_SECONDS = 1.0
+
+
+# Best-of-n wall clock for importing `module` in a fresh interpreter
+def time_import(module, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', f'import {module}'], check=True)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def time_imports(modules=None, repeat=5):
+    return {module: time_import(module, repeat) for module in modules or ENTRY_MODULES}
+
+
+def print_import_times(timings):
+    width = max(len(m) for m in timings)
+    for module, seconds in timings.items():
+        status = 'ok' if seconds < MAX_IMPORT_SECONDS else 'SLOW'
+        print(f'{module.ljust(width)}  {seconds * 1000:7.1f} ms  {status}')
+
+
+# (dictionary words, archived puzzles) for each synthetic fixture
+SIZES = {
+    'small': (10_000, 1_000),
+    'medium': (100_000, 10_000),
+    'large': (1_000_000, 50_000),
+}
+# Under cache.DIR
+FIXTURES_DIR = 'benchmark/'
+# Archive answers come from a word list this size, about that of the real verified words
+ANSWER_WORDS = 30_000
+# Puzzles sampled for the per-puzzle hot paths (solve, render)
+SAMPLE_PUZZLES = 200
+# Slower than the baseline by more than this is reported as a regression
+REGRESSION_RATIO = 1.10
+# English letter frequencies (%), so synthetic words share letters the way real ones do
+LETTER_WEIGHTS = {
+    'A': 8.2, 'B': 1.5, 'C': 2.8, 'D': 4.3, 'E': 12.7, 'F': 2.2, 'G': 2.0, 'H': 6.1, 'I': 7.0, 'J': 0.2, 'K': 0.8,
+    'L': 4.0, 'M': 2.4, 'N': 6.7, 'O': 7.5, 'P': 1.9, 'Q': 0.1, 'R': 6.0, 'S': 6.3, 'T': 9.1, 'U': 2.8, 'V': 1.0,
+    'W': 2.4, 'X': 0.2, 'Y': 2.0, 'Z': 0.1,
+}
+LENGTH_WEIGHTS = {4: 10, 5: 14, 6: 16, 7: 16, 8: 14, 9: 11, 10: 8, 11: 6, 12: 5}
+
+
+# Same seed, same words; duplicates are dropped so the result can be a little under `n`
+def synthetic_words(n, seed=0):
+    rng = random.Random(seed)
+    letters, letter_weights = list(LETTER_WEIGHTS), list(LETTER_WEIGHTS.values())
+    lengths = rng.choices(list(LENGTH_WEIGHTS), weights=list(LENGTH_WEIGHTS.values()), k=n)
+    return sorted({''.join(rng.choices(letters, weights=letter_weights, k=length)) for length in lengths})
+
+
+# Puzzles built from the pangram letter sets of `words`, solved against `answer_words`, one per day
+def synthetic_puzzles(words, answer_words, n, seed=0):
+    rng = random.Random(seed)
+    masks = sorted({letter_mask(w) for w in words if len(set(w)) == 7})
+    start = date(2018, 5, 9)
+    puzzles = []
+    for i in range(n):
+        letters = mask_letters(rng.choice(masks))
+        puzzle = Puzzle.of(rng.choice(letters), letters)
+        puzzle.date = start + timedelta(days=i)
+        puzzles.append(puzzle)
+    return BatchSolver(answer_words).solve_puzzles(puzzles)
+
+
+def fixture_paths(size, seed=0):
+    dirpath = os.path.join(cache.DIR + FIXTURES_DIR, f'{size}-seed{seed}')
+    return {
+        'dir': dirpath,
+        'words': os.path.join(dirpath, 'words.txt'),
+        'binary': os.path.join(dirpath, 'words.bin'),
+        'ndjson': os.path.join(dirpath, 'puzzles.ndjson'),
+        'archive': os.path.join(dirpath, 'puzzles.bin'),
+    }
+
+
+# Written once per size and seed and reused, since generating the large fixture takes a while
+def make_fixtures(size, seed=0):
+    paths = fixture_paths(size, seed)
+    if os.path.exists(paths['archive']):
+        return paths
+    n_words, n_puzzles = SIZES[size]
+    os.makedirs(paths['dir'], exist_ok=True)
+    words = synthetic_words(n_words, seed)
+    with open(paths['words'], 'w') as outfile:
+        outfile.write('\n'.join(words))
+    save_binary_dictionary(words, paths['binary'])
+    answer_words = random.Random(seed).sample(words, min(ANSWER_WORDS, len(words)))
+    puzzles = synthetic_puzzles(words, answer_words, n_puzzles, seed)
+    cache.save_ndjson(puzzles, paths['ndjson'])
+    archive.save_archive(puzzles, paths['archive'])
+    return paths
+
+
+# Best-of-n wall clock, then one more run under tracemalloc for the peak Python heap
+def measure(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_bytes': peak}
+
+
+def hot_paths(paths):
+    words = cache.load_dictionary(paths['words'])
+    index = WordIndex(words)
+    binary = BinaryDictionary(paths['binary'])
+    sample = archive.load_puzzles(paths['archive'])[:SAMPLE_PUZZLES]
+    pairs = [(p.key_letter, p.other_letters) for p in sample]
+
+    def solve_each(dictionary):
+        for key, letters in pairs:
+            Puzzle.of(key, letters).solve(dictionary)
+
+    return {
+        'cache.load_dictionary': lambda: cache.load_dictionary(paths['words']),
+        'BinaryDictionary': lambda: len(BinaryDictionary(paths['binary'])),
+        'cache.load_pickle_ndjson': lambda: cache.load_pickle_ndjson(paths['ndjson']),
+        'archive.load_puzzles': lambda: archive.load_puzzles(paths['archive']),
+        'WordIndex': lambda: WordIndex(words),
+        'Puzzle.solve(set)': lambda: solve_each(words),
+        'Puzzle.solve(WordIndex)': lambda: solve_each(index),
+        'Puzzle.solve(BinaryDictionary)': lambda: solve_each(binary),
+        'BatchSolver.solve_puzzles': lambda: BatchSolver(words).solve_puzzles(
+            Puzzle.of(k, l) for k, l in pairs),
+        'main.get_puzzles': lambda: get_puzzles(words),
+        'Puzzle.solution_grid': lambda: [p.solution_grid() for p in sample],
+        'Puzzle.solution_grid_markdown': lambda: [p.solution_grid_markdown() for p in sample],
+    }
+
+
+def run_suite(size, repeat=3, seed=0, only=None):
+    paths = make_fixtures(size, seed)
+    results = {}
+    for name, fn in hot_paths(paths).items():
+        if only and not any(o in name for o in only):
+            continue
+        results[name] = measure(fn, repeat)
+        print(f'{name.ljust(32)} {results[name]["seconds"] * 1000:10.1f} ms '
+              f'{results[name]["peak_bytes"] / 2 ** 20:9.1f} MiB')
+    return {
+        'meta': {
+            'size': size,
+            'words': SIZES[size][0],
+            'puzzles': SIZES[size][1],
+            'seed': seed,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+        },
+        'results': results,
+    }
+
+
+def save_results(report, filepath):
+    with open(filepath, 'w') as outfile:
+        json.dump(report, outfile, indent=2)
+
+
+def load_results(filepath):
+    with open(filepath, 'r') as infile:
+        return json.load(infile)
+
+
+# Timing and memory ratios against `baseline` for every benchmark both runs have; True if any regressed
+def compare(report, baseline):
+    if report['meta']['size'] != baseline['meta']['size']:
+        print(f'Warning: comparing a {report["meta"]["size"]} run against a {baseline["meta"]["size"]} baseline')
+    if report['meta']['seed'] != baseline['meta']['seed']:
+        print(f'Warning: comparing a seed {report["meta"]["seed"]} run against a seed {baseline["meta"]["seed"]} '
+              'baseline')
+    regressed = False
+    rows = [['Benchmark', 'Baseline ms', 'ms', 'Time', 'Memory']]
+    for name, result in report['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        time_ratio = result['seconds'] / base['seconds']
+        memory_ratio = result['peak_bytes'] / base['peak_bytes'] if base['peak_bytes'] else 1.0
+        status = ''
+        if time_ratio > REGRESSION_RATIO:
+            status = ' SLOWER'
+            regressed = True
+        rows.append([name, f'{base["seconds"] * 1000:.1f}', f'{result["seconds"] * 1000:.1f}',
+                     f'{time_ratio:.2f}x{status}', f'{memory_ratio:.2f}x'])
+    print(util.grid_str(rows))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import-time check, or the offline hot-path benchmark suite.')
+    parser.add_argument('--suite', action='store_true', help='run the hot-path benchmarks instead of import times')
+    parser.add_argument('--size', choices=list(SIZES), default='small')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='*', help='run benchmarks whose names contain any of these')
+    parser.add_argument('--out', help='save results as JSON')
+    parser.add_argument('--baseline', help='compare against a saved JSON run; exits 1 on a regression')
+    args = parser.parse_args()
+
+    if not args.suite:
+        timings = time_imports()
+        print_import_times(timings)
+        if any(seconds >= MAX_IMPORT_SECONDS for seconds in timings.values()):
+            sys.exit(1)
+        return
+
+    report = run_suite(args.size, args.repeat, args.seed, args.only)
+    if args.out:
+        save_results(report, args.out)
+    if args.baseline and compare(report, load_results(args.baseline)):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
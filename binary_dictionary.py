@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+
+from word_index import LETTER_BITS, letter_mask
+
+DATA_FILE = 'words.npy'
+OFFSETS_FILE = 'offsets.npy'
+MASKS_FILE = 'masks.npy'
+
+
+# Other processes may have the old files memory-mapped, and truncating a mapped file kills them with SIGBUS
+# on their next read. So the new files are written to a temporary directory and then renamed over the old
+# ones: existing mappings keep the old (now unlinked) files and later opens see the new ones
+def save_arrays(dirpath, arrays):
+    tmp_dirpath = f'{dirpath.rstrip("/")}.tmp-{os.getpid()}'
+    os.makedirs(tmp_dirpath, exist_ok=True)
+    for filename, array in arrays.items():
+        with open(os.path.join(tmp_dirpath, filename), 'wb') as outfile:
+            np.save(outfile, array)
+    os.makedirs(dirpath, exist_ok=True)
+    for filename in arrays:
+        os.replace(os.path.join(tmp_dirpath, filename), os.path.join(dirpath, filename))
+    os.rmdir(tmp_dirpath)
+
+
+def save_binary_dictionary(words, dirpath):
+    words = sorted(set(words))
+    encoded = [w.encode('ascii') for w in words]
+    offsets = np.zeros(len(words) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(w) for w in encoded])
+    save_arrays(dirpath, {
+        DATA_FILE: np.frombuffer(b''.join(encoded), dtype=np.uint8),
+        OFFSETS_FILE: offsets,
+        MASKS_FILE: np.array([letter_mask(w) for w in words], dtype=np.uint32),
+    })
+
+
+class BinaryDictionary:
+    """A sorted word list backed by memory-mapped .npy files.
+
+    Word `i` is `data[offsets[i]:offsets[i + 1]]` and its letter mask is `masks[i]`. Nothing is
+    decoded into a str until it is asked for, and every process that opens the same directory
+    shares the same pages.
+    """
+
+    def __init__(self, dirpath):
+        self.dirpath = dirpath
+        self.data = np.load(os.path.join(dirpath, DATA_FILE), mmap_mode='r')
+        self.offsets = np.load(os.path.join(dirpath, OFFSETS_FILE), mmap_mode='r')
+        self.masks = np.load(os.path.join(dirpath, MASKS_FILE), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.word_bytes(i).decode('ascii')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __contains__(self, word):
+        return self.index_of(word) >= 0
+
+    def word_bytes(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    # Binary search over the raw bytes, -1 if missing
+    def index_of(self, word):
+        target = word.encode('ascii')
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.word_bytes(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self.word_bytes(lo) == target:
+            return lo
+        return -1
+
+    def get_words(self, word_ids):
+        return [self[i] for i in word_ids]
+
+    def solve_ids(self, key_letter, letters):
+        outside = ~np.uint32(letter_mask(letters) | LETTER_BITS[key_letter])
+        return np.flatnonzero(((self.masks & outside) == 0) & ((self.masks & LETTER_BITS[key_letter]) != 0))
+
+    # Same interface as WordIndex, so Puzzle.solve can take either
+    def solve(self, key_letter, letters):
+        return self.get_words(self.solve_ids(key_letter, letters))
+
+    def pangrams(self, letters):
+        return self.get_words(np.flatnonzero(self.masks == letter_mask(letters)))
@@ -0,0 +1,142 @@
+import argparse
+import hashlib
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import archive
+import cache
+import instrument
+import scraper
+
+STATE_FILE = cache.DIR + 'build-state.json'
+SCRABBLE_FILE = 'collins-2019.txt'
+
+# `build(output)` must regenerate `output` from `inputs` alone
+Stage = namedtuple('Stage', ['name', 'output', 'inputs', 'build'])
+
+STAGES = [
+    Stage('puzzles', cache.PUZZLES_FILE, [scraper.PAGE_RECORDS_FILE], cache.save_puzzle_archive),
+    Stage('retconned', 'retconned-words.txt', [scraper.PAGE_RECORDS_FILE], cache.save_retconned_words),
+    Stage('verified', 'verified-words.txt',
+          [cache.PUZZLES_FILE, archive.words_path(cache.PUZZLES_FILE), 'retconned-words.txt'],
+          cache.save_verified_words),
+    Stage('unverified', 'unverified-words.txt',
+          [SCRABBLE_FILE, 'retconned-words.txt', cache.PUZZLES_FILE, archive.words_path(cache.PUZZLES_FILE)],
+          cache.save_unverified_words),
+    Stage('likely', 'likely-words.txt', ['unverified-words.txt'], cache.save_likely_words),
+]
+STAGES_BY_NAME = {stage.name: stage for stage in STAGES}
+
+
+def file_hash(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as infile:
+        for block in iter(lambda: infile.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {}
+    with open(STATE_FILE, 'r') as infile:
+        return json.load(infile)
+
+
+def save_state(state):
+    os.makedirs(cache.DIR, exist_ok=True)
+    with open(STATE_FILE, 'w') as outfile:
+        json.dump(state, outfile, indent=2, sort_keys=True)
+
+
+# Stages whose output is one of this stage's inputs
+def dependencies(stage):
+    return [other.name for other in STAGES if other.output in stage.inputs]
+
+
+# 'build', 'skip' (inputs unchanged since the last build) or 'missing' (a source file is gone)
+def plan_stage(stage, state, force=False):
+    if any(not os.path.exists(path) for path in stage.inputs):
+        return 'missing'
+    if force or not os.path.exists(stage.output):
+        return 'build'
+    previous = state.get(stage.name, {}).get('inputs')
+    current = {path: file_hash(path) for path in stage.inputs}
+    return 'skip' if previous == current else 'build'
+
+
+def run_stage(name):
+    stage = STAGES_BY_NAME[name]
+    input_hashes = {path: file_hash(path) for path in stage.inputs}
+    with instrument.stage(f'build.{name}'):
+        stage.build(stage.output)
+    return {'inputs': input_hashes, 'output': file_hash(stage.output), 'instrument': instrument.take()}
+
+
+# Runs stages as soon as everything upstream of them is up to date; independent stages run in parallel
+def build(force=(), workers=None):
+    state = load_state()
+    remaining = {stage.name for stage in STAGES}
+    done = set()
+    running = {}
+    with ProcessPoolExecutor(workers, initializer=instrument.reset) as pool:
+        while remaining or running:
+            ready = [name for name in remaining if set(dependencies(STAGES_BY_NAME[name])) <= done]
+            for name in sorted(ready):
+                remaining.remove(name)
+                stage = STAGES_BY_NAME[name]
+                action = plan_stage(stage, state, force=name in force)
+                if action == 'build':
+                    print(f'Building {name} -> {stage.output}')
+                    running[pool.submit(run_stage, name)] = name
+                    continue
+                if action == 'missing':
+                    if not os.path.exists(stage.output):
+                        missing = [path for path in stage.inputs if not os.path.exists(path)]
+                        raise FileNotFoundError(f"Can't build {stage.output}, missing {', '.join(missing)}")
+                    print(f'Keeping {stage.output}, its sources are not available')
+                done.add(name)
+            if not running:
+                if remaining and not ready:
+                    raise RuntimeError(f"Build graph has a cycle: {', '.join(sorted(remaining))}")
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                state[name] = future.result()
+                instrument.merge(state[name].pop('instrument'))
+                save_state(state)
+                done.add(name)
+    return state
+
+
+# Nightly refresh: fetch every puzzle up to the latest that has no stored record yet (new ones, plus any gaps
+# left by failed pages), then rebuild whatever they affect
+def refresh(force=(), workers=None):
+    urls = cache.missing_puzzle_urls(scraper.puzzle_id_from_url(url) for url in scraper.get_page_records())
+    scraper.cache_urls(urls)
+    scraper.get_puzzle_pages(urls)
+    return build(force=force, workers=workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the derived word lists and puzzle archive.')
+    parser.add_argument('--refresh', action='store_true', help='fetch new puzzles before building')
+    parser.add_argument('--force', nargs='*', default=[], choices=sorted(STAGES_BY_NAME),
+                        help='rebuild these stages even if their inputs are unchanged')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--profile', nargs='?', const='time', choices=['time', 'cprofile'],
+                        help=f'write a timing report to {instrument.REPORTS_DIR} (same as setting {instrument.ENV_VAR})')
+    args = parser.parse_args()
+    if args.profile:
+        instrument.enable(args.profile)
+    if args.refresh:
+        refresh(force=set(args.force), workers=args.workers)
+    else:
+        build(force=set(args.force), workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
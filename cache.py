@@ -1,14 +1,22 @@
 import os
 
 import jsonpickle
+import numpy as np
 from tqdm import tqdm
 
+import archive
+import instrument
+import postings
 import scraper
-from main import Puzzle
+from batch import BatchSolver
+from binary_dictionary import BinaryDictionary, save_binary_dictionary
+from features import FeatureTable
+from frequency import FrequencyStore, count_brown_words, save_frequency_store
 
 DIR = 'cache/'
-# Just manually fix this number from this link: https://www.sbsolver.com/archive
-LATEST = 2176
+PUZZLES_FILE = DIR + 'puzzles.bin'
+# jsonpickle archive from before puzzles.bin; converted on first load
+LEGACY_PUZZLES_FILE = DIR + 'old-puzzles.ndjson'
 
 
 # Not a python dictionary, but a dictionary of words
@@ -25,19 +33,138 @@ def load_dictionary(dictionary_name):
         return {w.strip() for w in infile.readlines()}
 
 
+# Memory-mapped union of one or more .txt dictionaries, rebuilt whenever a source file is newer
+def load_binary_dictionary(*dictionary_names):
+    sources = [add_txt_extension(name) for name in dictionary_names]
+    dirpath = DIR + '+'.join(name.removesuffix('.txt') for name in sources) + '.bin'
+    for source in sources:
+        if not os.path.exists(source) and source in DERIVED_DICTIONARIES:
+            DERIVED_DICTIONARIES[source](source)
+    if not os.path.exists(dirpath) or os.path.getmtime(dirpath) < max(os.path.getmtime(s) for s in sources):
+        words = set()
+        for source in sources:
+            words |= load_dictionary(source)
+        save_binary_dictionary(words, dirpath)
+        os.utime(dirpath)
+    return BinaryDictionary(dirpath)
+
+
+def load_feature_table(*dictionary_names):
+    return FeatureTable(load_binary_dictionary(*dictionary_names))
+
+
+def load_frequencies():
+    dirpath = DIR + 'brown-freq'
+    if not os.path.exists(dirpath):
+        save_frequency_store(count_brown_words(), dirpath)
+    return FrequencyStore(dirpath)
+
+
+# Newest first. Incremental updates append to the end of the file, so order by date here
 def load_all_puzzles():
-    filepath = DIR + 'old-puzzles.ndjson'
-    if not os.path.exists(filepath):
+    filepath = ensure_puzzle_archive()
+    return sorted(archive.load_puzzles(filepath), key=lambda p: p.date, reverse=True)
+
+
+# Streams archive records with only the requested fields, see archive.iter_records
+def iter_puzzle_records(fields=None):
+    return archive.iter_records(ensure_puzzle_archive(), fields or archive.FIELDS)
+
+
+# Rebuilt whenever the archive has changed since the postings were written
+def load_postings():
+    archive_path = ensure_puzzle_archive()
+    dirpath = DIR + 'postings'
+    if not os.path.exists(dirpath) or os.path.getmtime(dirpath) < os.path.getmtime(archive_path):
+        postings.save_postings(archive_path, dirpath)
+        os.utime(dirpath)
+    return postings.PostingsIndex(archive_path, dirpath)
+
+
+def ensure_puzzle_archive():
+    filepath = PUZZLES_FILE
+    if os.path.exists(filepath) and not archive.is_current(filepath):
+        # Older archives don't record puzzle ids; rebuilt from the cached pages and page records
         save_all_puzzles(filepath)
-    return load_pickle_ndjson(filepath)
+    if not os.path.exists(filepath):
+        if os.path.exists(LEGACY_PUZZLES_FILE):
+            archive.save_archive(load_pickle_ndjson(LEGACY_PUZZLES_FILE), filepath)
+        else:
+            save_all_puzzles(filepath)
+    return filepath
 
 
-def save_all_puzzles(filepath):
-    prev_puzzles = [scraper.scrape_puzzle(f'https://www.sbsolver.com/s/{i}') for i in
-                    tqdm(reversed(range(1, LATEST + 1)))]
-    for p in prev_puzzles:
+# Newest first, from `last` (defaults to the latest puzzle on the archive page) down to `first`
+def archive_urls(first=1, last=None):
+    if last is None:
+        last = scraper.latest_puzzle_id()
+    return [scraper.puzzle_url(i) for i in reversed(range(first, last + 1))]
+
+
+# Newest first: every puzzle up to the latest whose sbsolver id isn't in `stored_ids`, so gaps left by failed
+# pages are filled as well as new puzzles fetched
+def missing_puzzle_urls(stored_ids):
+    stored_ids = set(stored_ids)
+    return [url for url in archive_urls() if scraper.puzzle_id_from_url(url) not in stored_ids]
+
+
+def stored_puzzle_ids(filepath=PUZZLES_FILE):
+    return {r['puzzle_id'] for r in archive.iter_records(filepath, ('puzzle_id',))}
+
+
+# Fetches only the puzzles the archive is missing and folds them into the word lists
+def update_puzzles():
+    filepath = PUZZLES_FILE
+    if not os.path.exists(filepath) or not archive.is_current(filepath):
+        ensure_puzzle_archive()
+        return []
+    stored_ids = stored_puzzle_ids(filepath)
+    if None in stored_ids:
+        # Converted from the legacy archive, so there's no telling which puzzles it holds
+        save_all_puzzles(filepath)
+        return []
+    urls = missing_puzzle_urls(stored_ids)
+    if not urls:
+        print('Puzzle archive is up to date')
+        return []
+    scraper.cache_urls(urls)
+    records = scraper.get_puzzle_pages(urls)
+    new_puzzles = [scraper.puzzle_from_record(r) for r in records]
+    for p in new_puzzles:
         p.calc_pangrams()
-    save_ndjson(prev_puzzles, filepath)
+    archive.append_archive(new_puzzles, filepath)
+    retconned_words = {w for r in records for w in r['retconned']}
+    update_word_lists(new_puzzles, retconned_words)
+    print(f'Added {len(new_puzzles)} new puzzles')
+    return new_puzzles
+
+
+# Same result as rebuilding the derived lists from scratch, but only solves the new puzzles
+def update_word_lists(new_puzzles, retconned_words):
+    if os.path.exists('verified-words.txt'):
+        verified = load_dictionary('verified-words') - retconned_words
+        save_dictionary(verified.union(*[p.all_words for p in new_puzzles]), 'verified-words')
+    if os.path.exists('retconned-words.txt'):
+        save_dictionary(load_dictionary('retconned-words') | retconned_words, 'retconned-words')
+    if not os.path.exists('unverified-words.txt'):
+        return
+    unverified = load_dictionary('unverified-words')
+    solver = BatchSolver(sorted(unverified))
+    solves = solver.solve((p.key_letter, p.all_letters()) for p in new_puzzles)
+    # Every word a new puzzle could have used is now either verified or illegal
+    seen = set(retconned_words).union(*[solver.get_words(word_ids) for word_ids in solves])
+    save_dictionary(unverified - seen, 'unverified-words')
+    if os.path.exists('likely-words.txt'):
+        save_dictionary(load_dictionary('likely-words') - seen, 'likely-words')
+
+
+@instrument.timed('save_all_puzzles')
+def save_all_puzzles(filepath):
+    urls = archive_urls()
+    scraper.cache_urls(urls)
+    prev_puzzles = [scraper.puzzle_from_record(r) for r in scraper.get_puzzle_pages(urls, progress=True)]
+    scraper.create_cache()
+    archive.save_archive(prev_puzzles, filepath)
 
 
 def add_txt_extension(string):
@@ -55,7 +182,10 @@ def save_ndjson(list_of_puzzles, filepath):
 
 def load_pickle_ndjson(filepath):
     with open(filepath, 'r') as infile:
-        return [jsonpickle.decode(line) for line in infile.readlines()]
+        lines = infile.readlines()
+    instrument.count('bytes.read', sum(len(line) for line in lines))
+    with instrument.stage('decode.jsonpickle'):
+        return [jsonpickle.decode(line) for line in lines]
 
 
 def load_scrabble_dictionary():
@@ -71,13 +201,33 @@ def read_lines(filename):
 def load_retconned_words():
     filepath = 'retconned-words.txt'
     if not os.path.exists(filepath):
-        retconned_word_lists = [scraper.scrape_retconned_words(f'https://www.sbsolver.com/s/{i}') for i in
-                                tqdm(reversed(range(1, LATEST + 1)))]
-        retconned_words = [w for l in retconned_word_lists for w in l]
-        save_dictionary(retconned_words, filepath)
+        urls = archive_urls()
+        scraper.cache_urls(urls)
+        scraper.get_puzzle_pages(urls, progress=True)
+        save_retconned_words(filepath)
     return load_dictionary(filepath)
 
 
+# The save_* functions below rebuild an artifact purely from files already on disk (see build.py)
+def save_retconned_words(filename):
+    records = scraper.get_page_records().values()
+    save_dictionary([w for r in records for w in r['retconned']], filename)
+
+
+def save_puzzle_archive(filepath):
+    puzzles = [scraper.puzzle_from_record(r) for r in scraper.get_page_records().values()]
+    puzzles.sort(key=lambda p: p.date, reverse=True)
+    scraper.create_cache()
+    archive.save_archive(puzzles, filepath)
+
+
+# Every word an official puzzle has accepted, minus the ones that have since been removed
+def save_verified_words(filename):
+    retconned = load_retconned_words()
+    records = iter_puzzle_records(('words',))
+    save_dictionary({w for r in records for w in r['words']} - retconned, filename)
+
+
 def load_unverified_words():
     filepath = 'unverified-words.txt'
     if not os.path.exists(filepath):
@@ -85,19 +235,23 @@ def load_unverified_words():
     return load_dictionary(filepath)
 
 
+@instrument.timed('save_unverified_words')
 def save_unverified_words(filename):
     scrabble_dictionary = load_scrabble_dictionary() - load_retconned_words()
     official_puzzles = load_all_puzzles()
-    unverified_words = scrabble_dictionary.copy()
-    # Re-solve all puzzles
-    for official_solve in tqdm(official_puzzles):
-        my_solve = Puzzle.of(official_solve.key_letter, official_solve.other_letters)
-        my_solve.solve(scrabble_dictionary)
-        illegal_words = set(my_solve.all_words) - set(official_solve.all_words)
+    solver = BatchSolver(sorted(scrabble_dictionary))
+    # Re-solve all puzzles in one batch, then replay them in order against the shrinking dictionary
+    all_solves = solver.solve((p.key_letter, p.all_letters()) for p in official_puzzles)
+    illegal = np.zeros(len(solver), dtype=bool)
+    solved = np.zeros(len(solver), dtype=bool)
+    for official_solve, word_ids in zip(tqdm(official_puzzles), all_solves):
+        my_words = word_ids[~illegal[word_ids]]
+        official_words = set(official_solve.all_words)
         # Refine scrabble dictionary
-        scrabble_dictionary -= illegal_words
+        illegal[[i for i in my_words if solver.words[i] not in official_words]] = True
         # Eliminate verified and illegal words
-        unverified_words -= set(my_solve.all_words)
+        solved[my_words] = True
+    unverified_words = solver.get_words(np.flatnonzero(~solved))
     print(f'Found {len(unverified_words)} unverified words')
     save_dictionary(unverified_words, filename)
 
@@ -110,16 +264,15 @@ def load_likely_words():
 
 
 def save_likely_words(filename):
-    unverified = load_unverified_words()
-    # Contain S
-    have_s = [w for w in unverified if 'S' in w]
-    # Contain ER
-    have_er = [w for w in unverified if 'E' in w and 'R' in w]
-    # Have +7 unique letters
-    have_plus7_letters = [w for w in unverified if len(set(w)) > 7]
-    # Other
-    likely_words = unverified - set(have_s) - set(have_er) - set(have_plus7_letters)
-    save_dictionary(likely_words, filename)
+    unverified = load_feature_table('unverified-words')
+    save_dictionary(unverified.words(unverified.likely()), filename)
+
+
+# Word lists that can be regenerated when missing
+DERIVED_DICTIONARIES = {
+    'unverified-words.txt': save_unverified_words,
+    'likely-words.txt': save_likely_words,
+}
 
 
 def load_pokedex():
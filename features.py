@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+
+from binary_dictionary import DATA_FILE, save_arrays
+from util import SCRABBLE_SCORES
+from word_index import LETTER_BITS
+
+FEATURES_FILE = 'features.npy'
+FEATURE_DTYPE = np.dtype([
+    ('length', np.uint8),
+    ('n_letters', np.uint8),
+    ('score', np.uint16),
+    ('has_s', np.bool_),
+    ('has_er', np.bool_),
+])
+
+# Scrabble score by ASCII byte, so a whole word list can be scored with one gather
+BYTE_SCORES = np.zeros(256, dtype=np.uint16)
+for letter, points in SCRABBLE_SCORES.items():
+    BYTE_SCORES[ord(letter)] = points
+
+
+def popcount(masks):
+    return np.unpackbits(np.ascontiguousarray(masks, dtype=np.uint32).view(np.uint8)).reshape(-1, 32).sum(axis=1)
+
+
+# Everything is derived from the arrays already in the binary dictionary, no per-word Python
+def compute_features(dictionary):
+    lengths = np.diff(dictionary.offsets)
+    masks = np.asarray(dictionary.masks)
+    scores = np.zeros(len(dictionary), dtype=np.int64)
+    nonempty = lengths > 0
+    if nonempty.any():
+        per_byte = BYTE_SCORES[np.asarray(dictionary.data)]
+        scores[nonempty] = np.add.reduceat(per_byte, np.asarray(dictionary.offsets[:-1])[nonempty])
+    er = LETTER_BITS['E'] | LETTER_BITS['R']
+    features = np.zeros(len(dictionary), dtype=FEATURE_DTYPE)
+    features['length'] = lengths
+    features['n_letters'] = popcount(masks)
+    features['score'] = scores
+    features['has_s'] = (masks & LETTER_BITS['S']) != 0
+    features['has_er'] = (masks & er) == er
+    return features
+
+
+class FeatureTable:
+    """Per-word features for a BinaryDictionary, stored next to it as features.npy.
+
+    Columns are NumPy arrays aligned with the dictionary's word ids, so a report is a few boolean
+    array operations and `words(selection)` decodes only the words it selects.
+    """
+
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+        filepath = os.path.join(dictionary.dirpath, FEATURES_FILE)
+        source = os.path.join(dictionary.dirpath, DATA_FILE)
+        if not os.path.exists(filepath) or os.path.getmtime(filepath) < os.path.getmtime(source):
+            # Readers may have the old table mapped, so it's swapped in rather than overwritten
+            save_arrays(dictionary.dirpath, {FEATURES_FILE: compute_features(dictionary)})
+        self.features = np.load(filepath, mmap_mode='r')
+        self.masks = dictionary.masks
+        self.lengths = self.features['length']
+        self.n_letters = self.features['n_letters']
+        self.scores = self.features['score']
+        self.has_s = self.features['has_s']
+        self.has_er = self.features['has_er']
+
+    def __len__(self):
+        return len(self.features)
+
+    # `selection` is a boolean array over the table or an array of word ids
+    def words(self, selection):
+        selection = np.asarray(selection)
+        if selection.dtype == np.bool_:
+            selection = np.flatnonzero(selection)
+        return self.dictionary.get_words(selection)
+
+    # Words that could still show up in a puzzle, see the README glossary
+    def likely(self):
+        return ~self.has_s & ~self.has_er & (self.n_letters <= 7)
@@ -0,0 +1,54 @@
+import os
+import ssl
+
+import numpy as np
+
+KEYS_FILE = 'keys.npy'
+COUNTS_FILE = 'counts.npy'
+
+
+def count_brown_words():
+    import nltk
+    from nltk.corpus import brown
+    try:
+        _create_unverified_https_context = ssl._create_unverified_context
+    except AttributeError:
+        pass
+    else:
+        ssl._create_default_https_context = _create_unverified_https_context
+    nltk.download('brown')
+    return nltk.FreqDist(brown.words())
+
+
+# Keeps the old brown_freq[w.lower()] semantics: only all-lowercase tokens count, keyed in upper case
+def save_frequency_store(freq_dist, dirpath):
+    counts = {w.upper(): n for w, n in freq_dist.items() if w.isascii() and w.isalpha() and w.islower()}
+    keys = sorted(counts)
+    os.makedirs(dirpath, exist_ok=True)
+    np.save(os.path.join(dirpath, KEYS_FILE), np.array([k.encode('ascii') for k in keys], dtype=np.bytes_))
+    np.save(os.path.join(dirpath, COUNTS_FILE), np.array([counts[k] for k in keys], dtype=np.int64))
+
+
+class FrequencyStore:
+    """Word counts from the Brown corpus as two sorted, memory-mapped arrays."""
+
+    def __init__(self, dirpath):
+        self.keys = np.load(os.path.join(dirpath, KEYS_FILE), mmap_mode='r')
+        self.counts = np.load(os.path.join(dirpath, COUNTS_FILE), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, word):
+        return int(self.lookup([word])[0])
+
+    # Counts for a list of upper-case words, 0 for words the corpus never uses
+    def lookup(self, words):
+        if not len(self.keys):
+            return np.zeros(len(words), dtype=np.int64)
+        # Longer than any key means missing; don't let the fixed-width cast truncate it into a match
+        fits = np.array([len(w) <= self.keys.itemsize for w in words], dtype=bool)
+        queries = np.array([w.encode('ascii') for w in words], dtype=self.keys.dtype)
+        positions = np.minimum(np.searchsorted(self.keys, queries), len(self.keys) - 1)
+        found = fits & (self.keys[positions] == queries)
+        return np.where(found, self.counts[positions], 0)
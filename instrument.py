@@ -0,0 +1,175 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+# 'time' (or any other non-empty value) for stage timers and counters; 'cprofile' to also dump a profile per stage
+ENV_VAR = 'SPELLING_BEE_PROFILE'
+DIR = 'cache/'
+REPORTS_DIR = DIR + 'reports/'
+PROFILES_DIR = DIR + 'profiles/'
+
+_lock = threading.Lock()
+_enabled = False
+_use_cprofile = False
+_started = None
+_stages = {}
+_counters = {}
+_profiles = {}
+_worker_profiles = {}
+# cProfile can only run one profiler at a time, so nested or concurrent stages are just timed
+_profiling = False
+
+
+def enable(mode='time'):
+    global _enabled, _use_cprofile, _started
+    if _enabled:
+        return
+    _enabled = True
+    _use_cprofile = mode == 'cprofile'
+    _started = time.perf_counter()
+    # So worker processes started with spawn are instrumented too
+    os.environ[ENV_VAR] = mode
+    atexit.register(write_report)
+
+
+def is_enabled():
+    return _enabled
+
+
+def count(name, n=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+# Wall clock per stage, summed over calls (and threads, so stages run on a pool can add up past the run time)
+@contextmanager
+def stage(name):
+    global _profiling
+    if not _enabled:
+        yield
+        return
+    profile = None
+    if _use_cprofile:
+        with _lock:
+            if not _profiling:
+                _profiling = True
+                if name not in _profiles:
+                    import cProfile
+                    _profiles[name] = cProfile.Profile()
+                profile = _profiles[name]
+    start = time.perf_counter()
+    if profile is not None:
+        profile.enable()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.disable()
+        seconds = time.perf_counter() - start
+        with _lock:
+            if profile is not None:
+                _profiling = False
+            calls, total = _stages.get(name, (0, 0.0))
+            _stages[name] = (calls + 1, total + seconds)
+
+
+def timed(name):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def report():
+    with _lock:
+        return {
+            'finished': datetime.now().isoformat(timespec='seconds'),
+            'elapsed_seconds': time.perf_counter() - _started if _started else 0.0,
+            'stages': {name: {'calls': calls, 'seconds': seconds}
+                       for name, (calls, seconds) in sorted(_stages.items(), key=lambda s: -s[1][1])},
+            'counters': dict(sorted(_counters.items())),
+        }
+
+
+def print_report(run_report):
+    print(f'Run took {run_report["elapsed_seconds"]:.2f}s')
+    for name, s in run_report['stages'].items():
+        print(f'  {name.ljust(24)} {s["seconds"]:9.3f}s {s["calls"]:>9,} calls')
+    for name, n in run_report['counters'].items():
+        print(f'  {name.ljust(24)} {n:>20,}')
+
+
+# Writes one .prof per profiled stage (open with pstats or snakeviz); returns {stage: path}
+def dump_profiles(tag):
+    if not _profiles:
+        return {}
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    ret = {}
+    for name, profile in _profiles.items():
+        ret[name] = f'{PROFILES_DIR}{tag}-{name}.prof'
+        profile.dump_stats(ret[name])
+    return ret
+
+
+# Forgets everything recorded so far. Forked workers start with a copy of the parent's stages and
+# counters, so pools that hand back `take` results use this as their initializer
+def reset():
+    global _stages, _counters, _profiles, _worker_profiles, _profiling
+    with _lock:
+        _stages, _counters, _profiles, _worker_profiles = {}, {}, {}, {}
+        _profiling = False
+
+
+# For worker processes, which exit without running atexit: hands back (and resets) everything
+# recorded so far so the parent can `merge` it into its own report
+def take():
+    if not _enabled:
+        return None
+    taken = report()
+    taken['profiles'] = dump_profiles(f'{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}')
+    reset()
+    return taken
+
+
+def merge(taken):
+    if not _enabled or not taken:
+        return
+    with _lock:
+        for name, s in taken['stages'].items():
+            calls, total = _stages.get(name, (0, 0.0))
+            _stages[name] = (calls + s['calls'], total + s['seconds'])
+        for name, n in taken['counters'].items():
+            _counters[name] = _counters.get(name, 0) + n
+        _worker_profiles.update(taken.get('profiles', {}))
+
+
+# Registered by `enable`, so every instrumented run leaves a JSON report (and .prof files) behind
+def write_report():
+    if not _enabled:
+        return None
+    run_report = report()
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    filepath = f'{REPORTS_DIR}run-{stamp}.json'
+    profiles = {**_worker_profiles, **dump_profiles(stamp)}
+    if profiles:
+        run_report['profiles'] = profiles
+    with open(filepath, 'w') as outfile:
+        json.dump(run_report, outfile, indent=2)
+    print_report(run_report)
+    print(f'Wrote {filepath}')
+    return filepath
+
+
+if os.environ.get(ENV_VAR):
+    enable(os.environ[ENV_VAR])
@@ -1,27 +1,30 @@
-import ssl
-from collections import Counter
+from functools import cache as memoize
+import os
 import random
 from datetime import date
 
 import cache
-import matplotlib.pyplot as plt
-import nltk
-import seaborn as sns
-from nltk.corpus import brown
-from tqdm import tqdm
-
+import instrument
 import scraper
+import search
+import space
 import util
-from util import grid_str, surround, find_median
+from batch import BatchSolver
+from binary_dictionary import BinaryDictionary
+from ngram_index import NgramIndex
+from pokedex import Pokedex, tally, write_pokegrams
+from repeats import RepeatIndex
+from util import first_length_grid, grid_str, group_by_first_and_length, surround, find_median
+from word_index import LETTER_BITS, WORD_IDS, WordIndex, is_valid_mask, letter_mask, mask_letters
+
+# Longest n-gram the shared NgramIndex covers; longer ones get an index of their own
+NGRAM_MAX_N = 3
 
-try:
-    _create_unverified_https_context = ssl._create_unverified_context
-except AttributeError:
-    pass
-else:
-    ssl._create_default_https_context = _create_unverified_https_context
-nltk.download('brown')
-brown_freq = nltk.FreqDist(brown.words())
+
+# Opening the store is cheap, but median_word_frequency runs once per puzzle
+@memoize
+def get_word_frequencies():
+    return cache.load_frequencies()
 
 
 class PokedexEntry:
@@ -42,10 +45,19 @@ class PokedexEntry:
 
 
 class Puzzle:
+    """A key letter plus a letter mask, with answers stored as ids into the shared WORD_IDS table.
+
+    `other_letters`, `all_words` and `all_pangrams` are properties over that compact state, so
+    code (and old jsonpickle archives) can keep treating them as plain lists.
+    """
+    __slots__ = ('key_letter', 'letter_mask', 'word_ids', 'pangram_ids', 'date', 'puzzle_id')
+
     def __init__(self, key_letter='X', other_letters=None):
-        self.all_words = None
-        self.all_pangrams = None
+        self.word_ids = None
+        self.pangram_ids = None
         self.date = date.today()
+        # sbsolver's number for the puzzle; None for puzzles that weren't scraped
+        self.puzzle_id = None
         self.key_letter = key_letter
 
         if other_letters is None:
@@ -62,11 +74,48 @@ class Puzzle:
 
     def __eq__(self, other):
         if isinstance(other, Puzzle):
-            return self.__str__() == other.__str__()
+            return self.key_letter == other.key_letter and self.letter_mask == other.letter_mask
         return False
 
     def __hash__(self):
-        return hash(self.__str__())
+        return hash((self.key_letter, self.letter_mask))
+
+    # Word ids only mean something to this process's WORD_IDS, so pickles and jsonpickle archives hold the words
+    def __getstate__(self):
+        return {'key_letter': self.key_letter, 'other_letters': self.other_letters, 'all_words': self.all_words,
+                'all_pangrams': self.all_pangrams, 'date': self.date, 'puzzle_id': self.puzzle_id}
+
+    def __setstate__(self, state):
+        self.key_letter = state['key_letter']
+        self.other_letters = state['other_letters']
+        self.all_words = state.get('all_words')
+        self.all_pangrams = state.get('all_pangrams')
+        self.date = state.get('date')
+        self.puzzle_id = state.get('puzzle_id')
+
+    @property
+    def other_letters(self):
+        return [c for c in mask_letters(self.letter_mask) if c != self.key_letter]
+
+    @other_letters.setter
+    def other_letters(self, letters):
+        self.letter_mask = letter_mask(letters) | LETTER_BITS[self.key_letter]
+
+    @property
+    def all_words(self):
+        return None if self.word_ids is None else WORD_IDS.words_of(self.word_ids)
+
+    @all_words.setter
+    def all_words(self, words):
+        self.word_ids = None if words is None else WORD_IDS.ids_of(words)
+
+    @property
+    def all_pangrams(self):
+        return None if self.pangram_ids is None else WORD_IDS.words_of(self.pangram_ids)
+
+    @all_pangrams.setter
+    def all_pangrams(self, words):
+        self.pangram_ids = None if words is None else WORD_IDS.ids_of(words)
 
     @staticmethod
     def of(key, word):
@@ -76,159 +125,146 @@ class Puzzle:
     def all_letters(self):
         return self.other_letters + [self.key_letter]
 
+    def mask(self):
+        return self.letter_mask
+
     def is_valid(self):
-        all_letters = self.all_letters()
-        if 'S' in all_letters:
-            return False
-        if 'E' in all_letters and 'R' in all_letters:
-            return False
-        return True
+        return is_valid_mask(self.letter_mask)
 
     def has(self, letter):
-        return letter in self.all_letters()
+        return bool(self.letter_mask & LETTER_BITS.get(letter, 0))
 
     def contains_word(self, word):
-        return self.key_letter in word and all([self.has(let) for let in word])
+        return self.key_letter in word and letter_mask(word) & ~self.mask() == 0
 
     def is_pangram(self, word):
-        return set(word) == set(self.all_letters())
+        return letter_mask(word) == self.mask()
 
     def is_perfect_pangram(self, word):
         return self.is_pangram(word) and len(word) == 7
 
+    # `dictionary` is either an iterable of words, a prebuilt WordIndex or a BinaryDictionary
     def solve(self, dictionary):
-        self.all_words = [w for w in dictionary if self.contains_word(w)]
-        self.all_pangrams = [w for w in self.all_words if self.is_pangram(w)]
+        if isinstance(dictionary, (WordIndex, BinaryDictionary)):
+            self.all_words = dictionary.solve(self.key_letter, self.all_letters())
+            self.all_pangrams = dictionary.pangrams(self.all_letters())
+            return
+        mask = self.mask()
+        self.all_words = [w for w in dictionary if self.key_letter in w and letter_mask(w) & ~mask == 0]
+        self.calc_pangrams()
+
+    # (first letter, length) -> answers, the one pass every grid renderer shares
+    def word_groups(self):
+        return group_by_first_and_length(self.all_words)
 
     def solution_grid(self):
-        all_firsts = sorted(list(set([w[0] for w in self.all_words])))
-        all_lengths = sorted(list(set([len(w) for w in self.all_words])))
-        first_sums = [sum([1 for w in self.all_words if w[0] == f]) for f in all_firsts]
-        length_sums = [sum([1 for w in self.all_words if len(w) == l]) for l in all_lengths]
-        grouped_words = {}
-        for w in sorted(self.all_words):
-            if (w[0], len(w)) in grouped_words:
-                grouped_words[(w[0], len(w))].append(w)
-            else:
-                grouped_words[(w[0], len(w))] = [w]
-        word_grid = [['\n'.join(grouped_words.get((f, l), '')) for l in all_lengths] for f in all_firsts]
-        header = ['', *all_lengths, 'Σ']
-        footer = ['Σ', *length_sums, sum(length_sums)]
-        final_grid = [header] + surround(all_firsts, word_grid, first_sums) + [footer]
+        groups = self.word_groups()
+        counts = {key: len(words) for key, words in groups.items()}
+        final_grid = first_length_grid(counts, lambda key: '\n'.join(groups.get(key, '')))
         grid_string = grid_str(final_grid)
         title = f'{self.date_str()} | {self.__str__()}'
         return f'{title}\n{grid_string}'
 
     def solution_grid_markdown(self):
         assert self.all_words is not None and self.all_pangrams is not None
-        all_firsts = sorted(list(set([w[0] for w in self.all_words])))
-        all_lengths = sorted(list(set([len(w) for w in self.all_words])))
-        first_sums = [sum([1 for w in self.all_words if w[0] == f]) for f in all_firsts]
-        length_sums = [sum([1 for w in self.all_words if len(w) == l]) for l in all_lengths]
-        grouped_words = {}
-        for w in sorted(self.all_words):
-            # if w in all_
-            if (w[0], len(w)) in grouped_words:
-                grouped_words[(w[0], len(w))].append(w)
-            else:
-                grouped_words[(w[0], len(w))] = [w]
-        word_grid = [[', '.join(grouped_words.get((f, l), '')) for l in all_lengths] for f in all_firsts]
+        groups = self.word_groups()
+        counts = {key: len(words) for key, words in groups.items()}
         # Add spoilertext
-        word_grid = [[f'>!{cell}!<' if cell else cell for cell in row] for row in word_grid]
-        header = ['', *all_lengths, 'Σ']
-        footer = ['Σ', *length_sums, sum(length_sums)]
-        final_grid = [header] + surround(all_firsts, word_grid, first_sums) + [footer]
+        final_grid = first_length_grid(counts, lambda key: f'>!{", ".join(groups[key])}!<' if key in groups else '')
         grid_string = util.markdown_table(final_grid)
         title = f'{self.date_str()} | {self.__str__()}'
         return f'{title}\n\n{grid_string}'
 
+    def hints(self, trie, min_length=4):
+        return trie.hint_counts(self.key_letter, self.other_letters, min_length)
+
+    # The NYT hint page: word/pangram totals, the first letter x length count grid and two-letter list
+    def hint_grid(self, trie, min_length=4):
+        hints = self.hints(trie, min_length)
+        final_grid = first_length_grid(hints['grid'])
+        all_firsts = [row[0] for row in final_grid[1:-1]]
+        two_letter = hints['two_letter']
+        two_letter_lines = [' '.join(f'{p}-{two_letter[p]}' for p in sorted(two_letter) if p[0] == f)
+                            for f in all_firsts]
+        title = (f'{self.__str__()} | WORDS: {hints["words"]}, PANGRAMS: {hints["pangrams"]}'
+                 f' ({hints["perfect_pangrams"]} Perfect)')
+        return f'{title}\n{grid_str(final_grid)}\nTwo letter list:\n' + '\n'.join(two_letter_lines)
+
     def n_words(self):
         assert self.all_words is not None
         return len(self.all_words)
 
     def median_word_frequency(self):
-        return find_median([brown_freq[w.lower()] for w in self.all_words])
+        return find_median(get_word_frequencies().lookup(self.all_words).tolist())
 
     def median_word_length(self):
         return find_median([len(w) for w in self.all_words])
 
     def print_word_frequencies(self):
-        data = [brown_freq[w.lower()] for w in self.all_words]
+        data = get_word_frequencies().lookup(self.all_words)
         print_histogram(data)
 
     def calc_pangrams(self):
         assert self.all_words is not None
-        letter_set = set(self.all_letters())
-        self.all_pangrams = [w for w in self.all_words if set(w) == letter_set]
+        mask = self.mask()
+        self.all_pangrams = [w for w in self.all_words if letter_mask(w) == mask]
 
     def date_str(self):
         if self.date is None:
             return ''
         return self.date.strftime("%B %d, %Y")
 
+    # `pokedex` is either a list of PokedexEntry or a WordIndex of them keyed by name (e.g. a pokedex.Pokedex)
     def pokedex_markdown(self, pokedex):
-        valid = [p for p in pokedex if self.contains_word(p.name)]
+        if isinstance(pokedex, WordIndex):
+            valid = pokedex.solve(self.key_letter, self.all_letters())
+        else:
+            valid = [p for p in pokedex if self.contains_word(p.name)]
         if not valid:
             return 'No Pokemon today!'
         self.all_words = list(set([p.name for p in valid]))
         self.all_pangrams = [w for w in self.all_words if self.is_pangram(w)]
-        return (f'{self.pokedex_normal_hint_grid(valid)}\n\n'
+        poke_tally = tally(valid, self.mask())
+        return (f'{self.pokedex_normal_hint_grid(poke_tally)}\n\n'
                 f'**Type Grid**\n\n'
-                f'{self.pokedex_type_grid(valid)}\n\n'
+                f'{self.pokedex_type_grid(poke_tally)}\n\n'
                 f'**Generation List**\n\n'
-                f'{self.pokedex_generation_hints(valid)}\n\n'
+                f'{self.pokedex_generation_hints(poke_tally)}\n\n'
                 f'**Solution**\n\n'
                 f'{self.solution_grid_markdown()}')
 
-    def pokedex_normal_hint_grid(self, answers):
-        all_names = [p.name for p in answers]
-        pokegrams = [p for p in answers if self.is_pangram(p.name)]
-        perfect_pokegrams = [p for p in answers if self.is_perfect_pangram(p.name)]
-
-        all_firsts = sorted(list(set([n[0] for n in all_names])))
-        all_lengths = sorted(list(set([len(n) for n in all_names])))
-        first_sums = [sum([1 for w in all_names if w[0] == f]) for f in all_firsts]
-        length_sums = [sum([1 for w in all_names if len(w) == l]) for l in all_lengths]
-        word_grid = [[sum([1 for n in all_names if n[0] == f and len(n) == l]) for l in all_lengths] for f in
-                     all_firsts]
-        # Remove zeros
-        word_grid = [[c if c else '' for c in row] for row in word_grid]
-        header = ['', *all_lengths, 'Σ']
-        footer = ['Σ', *length_sums, sum(length_sums)]
-        final_grid = [header] + surround(all_firsts, word_grid, first_sums) + [footer]
-
-        str_builder = f'This puzzle has {len(answers)} Pokémon'
-        if pokegrams:
-            str_builder += f', with {len(pokegrams)} Pokégrams'
-        if perfect_pokegrams:
-            str_builder += f', and {len(perfect_pokegrams)} perfect Pokégrams'
-        if not pokegrams and not perfect_pokegrams:
+    def pokedex_normal_hint_grid(self, poke_tally):
+        final_grid = first_length_grid(poke_tally.grid)
+
+        str_builder = f'This puzzle has {poke_tally.total} Pokémon'
+        if poke_tally.pokegrams:
+            str_builder += f', with {poke_tally.pokegrams} Pokégrams'
+        if poke_tally.perfect_pokegrams:
+            str_builder += f', and {poke_tally.perfect_pokegrams} perfect Pokégrams'
+        if not poke_tally.pokegrams and not poke_tally.perfect_pokegrams:
             str_builder += f', with no Pokégrams'
         str_builder += '\n\n'
         str_builder += util.markdown_table(final_grid)
         return str_builder
 
-    def pokedex_type_grid(self, poke_answers):
-        all_primary_types = sorted(list(set([p.type1 for p in poke_answers])))
-        all_secondary_types = sorted(list(set([p.type2 for p in poke_answers])))
+    def pokedex_type_grid(self, poke_tally):
+        all_primary_types = sorted(poke_tally.type1s)
+        all_secondary_types = sorted(poke_tally.type2s)
         # Move "NONE" to the front
         if "NONE" in all_secondary_types:
             all_secondary_types.remove("NONE")
             all_secondary_types = ["NONE"] + all_secondary_types
-        primary_sums = [sum([1 for p in poke_answers if p.type1 == t]) for t in all_primary_types]
-        secondary_sums = [sum([1 for p in poke_answers if p.type2 == t]) for t in all_secondary_types]
-        grid = [[sum([1 for p in poke_answers if p.type1 == t1 and p.type2 == t2]) for t2 in all_secondary_types] for t1
-                in all_primary_types]
+        primary_sums = [poke_tally.type1s[t] for t in all_primary_types]
+        secondary_sums = [poke_tally.type2s[t] for t in all_secondary_types]
+        grid = [[poke_tally.types[(t1, t2)] for t2 in all_secondary_types] for t1 in all_primary_types]
 
         header = ['↓Primary/Secondary→', *all_secondary_types, 'Σ']
         footer = ['Σ', *secondary_sums, sum(primary_sums)]
         return util.markdown_table([header] + surround(all_primary_types, grid, primary_sums) + [footer])
 
-    def pokedex_generation_hints(self, poke_answers):
-        gens = sorted(list(set([p.gen for p in poke_answers])))
-        gen_strs = [f'Gen. {g}' for g in gens]
-        gen_sums = [sum([1 for p in poke_answers if p.gen == g]) for g in gens]
-        grid = [[label, total] for label, total in zip(gen_strs, gen_sums)]
+    def pokedex_generation_hints(self, poke_tally):
+        gens = sorted(poke_tally.gens)
+        grid = [[f'Gen. {g}', poke_tally.gens[g]] for g in gens]
         return util.markdown_table(grid)
 
     def markdown_filename(self):
@@ -239,17 +275,48 @@ def is_blankspace(string):
     return all([c.isspace() for c in string])
 
 
+# Valid and invalid puzzles alike; iterate space.PuzzleSpace directly to avoid building them all
 def get_puzzles(dictionary):
-    pangrams = [w for w in dictionary if len(Counter(w)) == 7]
-    puzzles = set()
-    for p in pangrams:
-        unique_letters = set(p)
-        for let in unique_letters:
-            puzzles.add(Puzzle.of(let, p))
-    return puzzles
+    return {Puzzle.of(key, mask_letters(mask)) for key, mask in space.PuzzleSpace(dictionary, include_invalid=True)}
+
+
+# Archived puzzles in archive order, built one at a time so a bulk report never holds the whole archive
+def iter_archive_puzzles():
+    for record in cache.iter_puzzle_records(('date', 'key_letter', 'mask', 'words')):
+        puzzle = Puzzle.of(record['key_letter'], mask_letters(record['mask']))
+        puzzle.date = record['date']
+        puzzle.all_words = record['words']
+        puzzle.calc_pangrams()
+        yield puzzle
+
+
+# Renders and writes each puzzle as it comes. A directory `path` (existing, or ending in '/') gets one file per
+# puzzle, named by date and letters so repeated letter sets don't collide; any other path gets every grid in one file
+def write_solution_grids(puzzles, path, markdown=False):
+    render = Puzzle.solution_grid_markdown if markdown else Puzzle.solution_grid
+    extension = '.md' if markdown else '.txt'
+    n_written = 0
+    with instrument.stage('render.grids'):
+        if path.endswith('/') or os.path.isdir(path):
+            os.makedirs(path, exist_ok=True)
+            for puzzle in puzzles:
+                prefix = puzzle.date.strftime('%Y-%m-%d-') if puzzle.date else ''
+                filename = prefix + puzzle.key_letter + ''.join(puzzle.other_letters) + extension
+                with open(os.path.join(path, filename), 'w') as outfile:
+                    outfile.write(render(puzzle))
+                n_written += 1
+        else:
+            with open(path, 'w') as outfile:
+                for puzzle in puzzles:
+                    outfile.write(render(puzzle) + '\n\n')
+                    n_written += 1
+    instrument.count('grids.written', n_written)
+    return n_written
 
 
 def print_histogram(xs, title='Title'):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     sns.histplot(xs, kde=False, color='skyblue')
     plt.xlabel('Value')
     plt.ylabel('Frequency')
@@ -258,24 +325,20 @@ def print_histogram(xs, title='Title'):
 
 
 def get_my_solves(dictionary, real_puzzles):
-    ret = []
-    for p in tqdm(real_puzzles):
-        my_p = Puzzle.of(p.key_letter, p.other_letters)
-        my_p.solve(dictionary)
-        ret.append(my_p)
-    return ret
+    solver = BatchSolver(dictionary)
+    return solver.solve_puzzles(Puzzle.of(p.key_letter, p.other_letters) for p in real_puzzles)
 
 
 def longest_non_pangram():
     words = cache.load_dictionary('verified-words')
-    puzzles = cache.load_all_puzzles()
     # Find longest
     target = max([len(w) for w in words if len(set(w)) < 7])
     # Find all longest
     longest = [w for w in words if len(set(w)) < 7 and len(w) == target]
-    # Print dates
-    dates = [p.date_str() for p in puzzles if any([w in p.all_words for w in longest])]
-    print(dates)
+    # Print dates, newest first
+    postings = cache.load_postings()
+    found = sorted({d for w in longest for d in postings.history(w)}, reverse=True)
+    print([d.strftime("%B %d, %Y") for d in found])
 
 
 def retconned_pangrams():
@@ -285,74 +348,131 @@ def retconned_pangrams():
     print(f'{"\n".join(rp)}')
 
 
-def absent_ngrams(ngram):
+# Archived puzzles and an NgramIndex over them, built once per max_n and shared by the n-gram reports
+@memoize
+def get_ngram_index(max_n=NGRAM_MAX_N):
     puzzles = cache.load_all_puzzles()
-    reduced_ngram = list(set(ngram))
-    puzzles_w_ngram = [p for p in puzzles if all([c in p.all_letters() for c in reduced_ngram])]
-    print(f"Puzzles that contain {ngram}: {len(puzzles_w_ngram)}")
-    puzzles_without_ngram_in_word = [p for p in puzzles_w_ngram if not any([ngram in w for w in p.all_words])]
+    return puzzles, NgramIndex([(p.mask(), p.all_words) for p in puzzles], max_n=max_n)
+
+
+def absent_ngrams(ngram):
+    puzzles, index = get_ngram_index(max(len(ngram), NGRAM_MAX_N))
+    print(f"Puzzles that contain {ngram}: {len(index.puzzles_allowing(ngram))}")
+    puzzles_without_ngram_in_word = [puzzles[i] for i in index.absent(ngram)]
     print(f"Puzzles that contain {ngram} with no words that contain {ngram}: {len(puzzles_without_ngram_in_word)}")
     for p in puzzles_without_ngram_in_word:
         print(p.solution_grid())
 
 
+# absent_ngrams for every n-gram up to `max_n` letters that some puzzle's letters allow, in one pass. The ones
+# no answer has ever used are listed last
+def all_absent_ngrams(max_n=NGRAM_MAX_N, min_puzzles=1):
+    _, index = get_ngram_index(max(max_n, NGRAM_MAX_N))
+    absent = index.all_absent(max_n)
+    never_used = sorted((g for g in absent if g not in index.used_in), key=lambda g: (-len(absent[g]), g))
+    for ngram in sorted((g for g in absent if g in index.used_in), key=lambda g: (len(absent[g]), g)):
+        if len(absent[ngram]) >= min_puzzles:
+            print(f"{ngram}: {len(absent[ngram])}/{len(index.puzzles_allowing(ngram))} puzzles never used it")
+    print(f"{len(never_used)} n-grams no answer has ever used:")
+    for ngram in never_used:
+        if len(absent[ngram]) >= min_puzzles:
+            print(f"{ngram}: allowed by {len(absent[ngram])} puzzles")
+    return absent
+
+
+# "Has there ever been a repeat puzzle?": exact repeats, the same letters with a new center, and puzzles one
+# letter apart (keeping the center unless `any_center`)
+def find_repeats(any_center=False):
+    records = list(cache.iter_puzzle_records(('date', 'key_letter', 'mask')))
+    index = RepeatIndex((r['key_letter'], r['mask']) for r in records)
+
+    def describe(i):
+        date_str = records[i]['date'].strftime("%B %d, %Y") if records[i]['date'] else 'undated'
+        return f"{date_str} {Puzzle.of(records[i]['key_letter'], mask_letters(records[i]['mask']))}"
+
+    exact = index.exact()
+    print(f'Exact repeats: {len(exact)}')
+    for ids in exact:
+        print('  ' + ' = '.join(describe(i) for i in ids))
+    swaps = index.center_swaps()
+    print(f'Same letters, different center: {len(swaps)}')
+    for by_key in swaps.values():
+        print('  ' + ' / '.join(describe(ids[0]) for ids in by_key.values()))
+    near = sorted(index.near_repeats(same_center_only=not any_center))
+    print(f'One letter apart: {len(near)}')
+    for n in near:
+        print(f'  {describe(n.a)} -> {describe(n.b)} (-{n.removed} +{n.added})')
+    return exact, swaps, near
+
+
 def unverified_description():
-    unverified = cache.load_unverified_words()
+    unverified = cache.load_feature_table('unverified-words')
+    total = len(unverified)
     # Contain S
-    have_s = [w for w in unverified if 'S' in w]
-    print(f'{(len(have_s) / len(unverified) * 100.0):.2f}% of unverified words contain \'S\' '
-          f'({len(have_s):,}/{len(unverified):,})')
+    have_s = unverified.has_s
+    print(f'{(have_s.sum() / total * 100.0):.2f}% of unverified words contain \'S\' '
+          f'({have_s.sum():,}/{total:,})')
     # Contain ER
-    have_er = [w for w in unverified if 'E' in w and 'R' in w]
-    print(f'{(len(have_er) / len(unverified) * 100.0):.2f}% of unverified words contain \'E\' and \'R\' '
-          f'({len(have_er):,}/{len(unverified):,})')
+    have_er = unverified.has_er
+    print(f'{(have_er.sum() / total * 100.0):.2f}% of unverified words contain \'E\' and \'R\' '
+          f'({have_er.sum():,}/{total:,})')
     # Have +7 unique letters
-    have_plus7_letters = [w for w in unverified if len(set(w)) > 7]
-    print(f'{(len(have_plus7_letters) / len(unverified) * 100.0):.2f}% of unverified words have more than 7 unique '
-          f'letters ({len(have_plus7_letters):,}/{len(unverified):,})')
+    have_plus7_letters = unverified.n_letters > 7
+    print(f'{(have_plus7_letters.sum() / total * 100.0):.2f}% of unverified words have more than 7 unique '
+          f'letters ({have_plus7_letters.sum():,}/{total:,})')
 
     # Other
-    other = unverified - set(have_s) - set(have_er) - set(have_plus7_letters)
-    print(f'{(len(other) / len(unverified) * 100.0):.2f}% of don\'t fit these criteria '
-          f'({len(other):,}/{len(unverified):,})')
+    other = ~(have_s | have_er | have_plus7_letters)
+    print(f'{(other.sum() / total * 100.0):.2f}% of don\'t fit these criteria '
+          f'({other.sum():,}/{total:,})')
     # Median scrabble score of other
-    median = util.find_median([util.scrabble_score(w) for w in other])
+    median = util.find_median(unverified.scores[other].tolist())
     print(f'  These words have an median scrabble score of: {median}')
     print(f'  Here are some examples of them:')
-    for w in random.sample(sorted(other), 10):
+    for w in random.sample(unverified.words(other), 10):
         print(f'  {w} ({util.scrabble_score(w)})')
     # Have 7 unique letters
-    have_7_letters = [w for w in other if len(set(w)) == 7]
-    print(f'{(len(have_7_letters) / len(other) * 100.0):.2f}% of "other" words have exactly 7 unique letters '
-          f'({len(have_7_letters):,}/{len(other):,})')
+    have_7_letters = other & (unverified.n_letters == 7)
+    print(f'{(have_7_letters.sum() / other.sum() * 100.0):.2f}% of "other" words have exactly 7 unique letters '
+          f'({have_7_letters.sum():,}/{other.sum():,})')
 
 
 def solve_today(key, other_letters):
     puzz = Puzzle.of(key, other_letters)
-    likely_words = cache.load_likely_words()
-    verified_words = cache.load_dictionary('verified-words')
-    solving_words = likely_words.union(verified_words)
+    solving_words = cache.load_binary_dictionary('likely-words', 'verified-words')
     puzz.solve(solving_words)
     print(puzz.solution_grid())
 
 
+# e.g. find_best_puzzles(search.Constraints(min_words=20, max_words=40, perfect_pangram=True), search.by_pangrams)
+def find_best_puzzles(constraints=None, score=None, n=10):
+    finder = search.PuzzleSearch(cache.load_dictionary('likely-words') | cache.load_dictionary('verified-words'))
+    found = finder.search(constraints or search.Constraints(), score or search.by_word_count, n)
+    for candidate in found:
+        print(finder.puzzle(candidate).solution_grid())
+    return found
+
+
 def solve_with_pokedex(key, other_letters):
     puzz = Puzzle.of(key, other_letters)
-    pokedex = cache.load_pokedex()
     with open('temp.md', 'w') as outfile:
-        outfile.write(puzz.pokedex_markdown(pokedex))
+        outfile.write(puzz.pokedex_markdown(Pokedex(cache.load_pokedex())))
 
 
-def find_pokegrams():
-    pokedex = cache.load_pokedex()
-    pokenames = [p.name for p in pokedex]
-    puzzles = cache.load_all_puzzles()
-    for puzzle in tqdm(puzzles):
-        puzzle.solve(pokenames)
-        if puzzle.all_pangrams:
-            print(puzzle)
-            with open(puzzle.markdown_filename(), 'w') as output:
-                output.write(puzzle.pokedex_markdown(pokedex))
+# Every archived puzzle (or, with `whole_space`, every valid puzzle the likely and verified words allow) with a
+# Pokégram, written to pokegrams/
+def find_pokegrams(whole_space=False, workers=None):
+    dex = Pokedex(cache.load_pokedex())
+    with instrument.stage('find.pokegrams'):
+        if whole_space:
+            found = dex.space_pokegrams(cache.load_dictionary('likely-words') | cache.load_dictionary('verified-words'))
+        else:
+            found = dex.archived_pokegrams(cache.iter_puzzle_records(('date', 'key_letter', 'mask')))
+    puzzles = [Puzzle.of(key, mask_letters(mask)) for key, mask, _ in found]
+    for puzzle, (_, _, puzzle_date) in zip(puzzles, found):
+        puzzle.date = puzzle_date
+        print(puzzle)
+    write_pokegrams(dex, puzzles, workers=workers)
 
 
 def main():
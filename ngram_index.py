@@ -0,0 +1,75 @@
+from collections import defaultdict
+from itertools import product
+
+import numpy as np
+
+from word_index import letter_mask, mask_letters
+
+
+def word_ngrams(word, max_n):
+    return {word[i:i + n] for n in range(1, max_n + 1) for i in range(len(word) - n + 1)}
+
+
+class NgramIndex:
+    """Inverted index from n-grams (up to `max_n` letters) to the puzzles whose answers use them.
+
+    Built from (letter mask, answers) pairs in archive order, so puzzle ids are positions in the
+    list it was built from.
+    """
+
+    def __init__(self, puzzles, max_n=3):
+        self.max_n = max_n
+        masks = []
+        self.used_in = defaultdict(set)
+        for puzzle_id, (mask, words) in enumerate(puzzles):
+            masks.append(mask)
+            for w in words:
+                for ngram in word_ngrams(w, max_n):
+                    self.used_in[ngram].add(puzzle_id)
+        self.masks = np.array(masks, dtype=np.uint32)
+
+    def __len__(self):
+        return len(self.masks)
+
+    def check_length(self, ngram):
+        if len(ngram) > self.max_n:
+            raise ValueError(f"'{ngram}' is longer than this index's max n-gram length ({self.max_n})")
+
+    # Puzzles whose letters could spell `ngram`, whether or not any answer does
+    def puzzles_allowing(self, ngram):
+        return np.flatnonzero((np.uint32(letter_mask(ngram)) & ~self.masks) == 0)
+
+    def absent(self, ngram):
+        self.check_length(ngram)
+        used = self.used_in.get(ngram, set())
+        return [i for i in self.puzzles_allowing(ngram).tolist() if i not in used]
+
+    # Every n-gram up to `max_n` letters that the letters of at least one puzzle can spell
+    def allowed_ngrams(self, max_n=None):
+        max_n = max_n or self.max_n
+        ret = set()
+        for mask in set(self.masks.tolist()):
+            letters = mask_letters(mask)
+            for n in range(1, max_n + 1):
+                ret.update(''.join(p) for p in product(letters, repeat=n))
+        return ret
+
+    # Every allowed n-gram, mapped to the puzzles that allowed it but never used it; for an n-gram no answer
+    # has ever used, that's every puzzle that allowed it. n-grams that share a letter set share one
+    # vectorized subset test.
+    def all_absent(self, max_n=None):
+        max_n = max_n or self.max_n
+        if max_n > self.max_n:
+            raise ValueError(f"This index only covers n-grams up to {self.max_n} letters, not {max_n}")
+        by_letters = defaultdict(list)
+        for ngram in self.allowed_ngrams(max_n):
+            by_letters[letter_mask(ngram)].append(ngram)
+        ret = {}
+        for mask, ngrams in by_letters.items():
+            allowing = np.flatnonzero((np.uint32(mask) & ~self.masks) == 0).tolist()
+            for ngram in ngrams:
+                used = self.used_in.get(ngram, set())
+                absent = [i for i in allowing if i not in used]
+                if absent:
+                    ret[ngram] = absent
+        return ret
@@ -0,0 +1,84 @@
+import hashlib
+import sqlite3
+import time
+import zlib
+
+# Pages per transaction when storing in bulk
+COMMIT_EVERY = 100
+
+
+class PageStore:
+    """Every fetched page in a single SQLite file, zlib-compressed and keyed by URL.
+
+    Each row keeps the SHA-256 of the uncompressed page so `verify` can catch corruption, and the
+    whole cache can be copied between machines as one file.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.conn = sqlite3.connect(filepath)
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS pages ('
+                              'url TEXT PRIMARY KEY, content BLOB NOT NULL, sha256 TEXT NOT NULL, '
+                              'size INTEGER NOT NULL, fetched_at REAL NOT NULL)')
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+
+    def __contains__(self, url):
+        return self.conn.execute('SELECT 1 FROM pages WHERE url = ?', (url,)).fetchone() is not None
+
+    def get(self, url):
+        row = self.conn.execute('SELECT content FROM pages WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+        return zlib.decompress(row[0])
+
+    def put(self, url, content):
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)', encode_row(url, content))
+
+    # `pages` is an iterable of (url, content) pairs
+    def put_many(self, pages):
+        batch = []
+        for url, content in pages:
+            batch.append(encode_row(url, content))
+            if len(batch) >= COMMIT_EVERY:
+                self.insert_rows(batch)
+                batch = []
+        self.insert_rows(batch)
+
+    def insert_rows(self, rows):
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)', rows)
+
+    def urls(self):
+        return [row[0] for row in self.conn.execute('SELECT url FROM pages ORDER BY url')]
+
+    def iter_pages(self):
+        for url, content in self.conn.execute('SELECT url, content FROM pages ORDER BY url'):
+            yield url, zlib.decompress(content)
+
+    # URLs whose stored page no longer decompresses or matches its hash
+    def verify(self):
+        bad = []
+        for url, content, sha256, size in self.conn.execute('SELECT url, content, sha256, size FROM pages'):
+            try:
+                page = zlib.decompress(content)
+            except zlib.error:
+                bad.append(url)
+                continue
+            if len(page) != size or hashlib.sha256(page).hexdigest() != sha256:
+                bad.append(url)
+        return bad
+
+    def delete(self, url):
+        with self.conn:
+            self.conn.execute('DELETE FROM pages WHERE url = ?', (url,))
+
+    def close(self):
+        self.conn.close()
+
+
+def encode_row(url, content):
+    return url, zlib.compress(content), hashlib.sha256(content).hexdigest(), len(content), time.time()
@@ -0,0 +1,85 @@
+import os
+from collections import Counter, namedtuple
+from multiprocessing import Pool
+
+from tqdm import tqdm
+
+import instrument
+from word_index import WordIndex, is_valid_mask, letter_mask, mask_letters
+
+POKEGRAMS_DIR = 'pokegrams/'
+
+# Every count the pokedex renderers need, gathered in one pass over a puzzle's answers
+PokedexTally = namedtuple('PokedexTally', ['total', 'pokegrams', 'perfect_pokegrams', 'grid', 'type1s', 'type2s',
+                                           'types', 'gens'])
+
+# Set in each pool worker by `init_worker`
+_pokedex = None
+
+
+def entry_name(entry):
+    return entry.name
+
+
+class Pokedex(WordIndex):
+    """PokedexEntry objects grouped by the letter mask of their name."""
+
+    def __init__(self, entries=()):
+        super().__init__(entries, key=entry_name)
+
+    # Letter sets that spell at least one Pokémon with exactly 7 distinct letters
+    def pokegram_masks(self):
+        return {mask for mask in self.by_mask if len(mask_letters(mask)) == 7}
+
+    # Archived (key letter, mask, date) triples whose letters spell a Pokémon
+    def archived_pokegrams(self, records):
+        masks = self.pokegram_masks()
+        return [(r['key_letter'], r['mask'], r['date']) for r in records if r['mask'] in masks]
+
+    # Every valid puzzle in the full space with a Pokégram, one per key letter. A puzzle needs a pangram
+    # from `dictionary`, so only pokegram masks that some dictionary word also spells count
+    def space_pokegrams(self, dictionary):
+        pangram_masks = {letter_mask(w) for w in dictionary if len(set(w)) == 7}
+        return [(key, mask, None) for mask in sorted(self.pokegram_masks() & pangram_masks) if is_valid_mask(mask)
+                for key in mask_letters(mask)]
+
+
+def tally(answers, puzzle_mask):
+    total = pokegrams = perfect_pokegrams = 0
+    grid = Counter()
+    type1s, type2s, types, gens = Counter(), Counter(), Counter(), Counter()
+    for p in answers:
+        name = p.name
+        total += 1
+        if letter_mask(name) == puzzle_mask:
+            pokegrams += 1
+            if len(name) == 7:
+                perfect_pokegrams += 1
+        grid[(name[0], len(name))] += 1
+        type1s[p.type1] += 1
+        type2s[p.type2] += 1
+        types[(p.type1, p.type2)] += 1
+        gens[p.gen] += 1
+    return PokedexTally(total, pokegrams, perfect_pokegrams, grid, type1s, type2s, types, gens)
+
+
+def init_worker(entries):
+    global _pokedex
+    _pokedex = Pokedex(entries)
+
+
+def render_pokegram(puzzle):
+    return puzzle.markdown_filename(), puzzle.pokedex_markdown(_pokedex)
+
+
+# Renders every main.Puzzle across a process pool and writes one markdown file per puzzle into `dirpath`
+def write_pokegrams(pokedex, puzzles, dirpath=POKEGRAMS_DIR, workers=None):
+    os.makedirs(dirpath, exist_ok=True)
+    entries = list(pokedex)
+    with Pool(workers or os.cpu_count(), initializer=init_worker, initargs=(entries,)) as pool:
+        # Rendering happens in the workers, so this stage covers the whole pool
+        with instrument.stage('render.pokegrams'):
+            for filename, markdown in tqdm(pool.imap(render_pokegram, puzzles, chunksize=16), total=len(puzzles)):
+                with open(os.path.join(dirpath, filename), 'w') as output:
+                    output.write(markdown)
+    instrument.count('pokegrams.written', len(puzzles))
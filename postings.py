@@ -0,0 +1,98 @@
+import os
+from datetime import datetime
+
+import numpy as np
+
+import archive
+from binary_dictionary import save_arrays
+from features import popcount
+from word_index import letter_mask
+
+OFFSETS_FILE = 'offsets.npy'
+PUZZLE_IDS_FILE = 'puzzle-ids.npy'
+DATES_FILE = 'dates.npy'
+LENGTHS_FILE = 'lengths.npy'
+N_LETTERS_FILE = 'n-letters.npy'
+
+
+# Word ids are the archive's own word table ids; puzzle ids are record positions in the archive
+def save_postings(archive_path, dirpath):
+    words = archive.WordTable(archive.words_path(archive_path)).words
+    dates = []
+    word_ids = []
+    puzzle_ids = []
+    for puzzle_id, record in enumerate(archive.iter_records(archive_path, ('date', 'word_ids'))):
+        dates.append(record['date'].toordinal() if record['date'] else 0)
+        word_ids.extend(record['word_ids'])
+        puzzle_ids.extend([puzzle_id] * len(record['word_ids']))
+    word_ids = np.array(word_ids, dtype=np.int64)
+    puzzle_ids = np.array(puzzle_ids, dtype=np.uint32)
+    # Group by word, keeping archive order within each word
+    order = np.argsort(word_ids, kind='stable')
+    offsets = np.zeros(len(words) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(word_ids, minlength=len(words)))
+    # A PostingsIndex may have the old arrays mapped, so they're swapped in rather than overwritten
+    save_arrays(dirpath, {
+        OFFSETS_FILE: offsets,
+        PUZZLE_IDS_FILE: puzzle_ids[order],
+        DATES_FILE: np.array(dates, dtype=np.int32),
+        LENGTHS_FILE: np.array([len(w) for w in words], dtype=np.uint8),
+        N_LETTERS_FILE: popcount(np.array([letter_mask(w) for w in words], dtype=np.uint32)).astype(np.uint8),
+    })
+
+
+class PostingsIndex:
+    """For every word that has been an official answer, the puzzles (and dates) it appeared in.
+
+    Postings for word id `i` are `puzzle_ids[offsets[i]:offsets[i + 1]]`, in archive order.
+    """
+
+    def __init__(self, archive_path, dirpath):
+        self.words = archive.WordTable(archive.words_path(archive_path)).words
+        self.ids = {w: i for i, w in enumerate(self.words)}
+        self.offsets = np.load(os.path.join(dirpath, OFFSETS_FILE), mmap_mode='r')
+        self.puzzle_ids = np.load(os.path.join(dirpath, PUZZLE_IDS_FILE), mmap_mode='r')
+        self.dates = np.load(os.path.join(dirpath, DATES_FILE), mmap_mode='r')
+        self.lengths = np.load(os.path.join(dirpath, LENGTHS_FILE), mmap_mode='r')
+        self.n_letters = np.load(os.path.join(dirpath, N_LETTERS_FILE), mmap_mode='r')
+        self.counts = np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.ids
+
+    def puzzles_with(self, word):
+        if word not in self.ids:
+            return np.empty(0, dtype=np.uint32)
+        i = self.ids[word]
+        return self.puzzle_ids[self.offsets[i]:self.offsets[i + 1]]
+
+    def count(self, word):
+        return len(self.puzzles_with(word))
+
+    # Every date `word` was an answer, oldest first
+    def history(self, word):
+        ordinals = np.sort(self.dates[self.puzzles_with(word)])
+        return [datetime.fromordinal(int(d)) for d in ordinals if d]
+
+    def first_appearance(self, word):
+        history = self.history(word)
+        return history[0] if history else None
+
+    def last_appearance(self, word):
+        history = self.history(word)
+        return history[-1] if history else None
+
+    def words_by_length(self, length):
+        return [self.words[i] for i in np.flatnonzero(self.lengths == length)]
+
+    def words_by_letters(self, n_letters):
+        return [self.words[i] for i in np.flatnonzero(self.n_letters == n_letters)]
+
+    # Most frequent answers as (word, count); n_letters=7 gives the most recurring pangrams
+    def top(self, n=10, n_letters=None):
+        candidates = np.arange(len(self.words)) if n_letters is None else np.flatnonzero(self.n_letters == n_letters)
+        best = candidates[np.argsort(-self.counts[candidates], kind='stable')[:n]]
+        return [(self.words[i], int(self.counts[i])) for i in best]
@@ -0,0 +1,78 @@
+from collections import defaultdict, namedtuple
+from itertools import combinations
+
+from word_index import LETTER_BITS, mask_letters
+
+# Two puzzles whose letter sets differ by one letter: `removed` is in a's letters, `added` in b's
+NearRepeat = namedtuple('NearRepeat', ['a', 'b', 'removed', 'added', 'same_center'])
+
+
+def bits_of(mask):
+    return [b for b in LETTER_BITS.values() if mask & b]
+
+
+def letter_of(bit):
+    return mask_letters(bit)[0]
+
+
+class RepeatIndex:
+    """Puzzles keyed by (key letter, letter mask), for finding repeats without comparing every pair.
+
+    Built from (key letter, mask) pairs, so puzzle ids are positions in that list. Near-repeats
+    come from bucketing every distinct mask under each of its one-letter deletions: two 7-letter
+    masks differ by exactly one letter iff they share a deletion, and they share only that one.
+    """
+
+    def __init__(self, pairs):
+        self.keys = []
+        self.masks = []
+        self.by_puzzle = defaultdict(list)
+        self.by_mask = defaultdict(list)
+        for puzzle_id, (key, mask) in enumerate(pairs):
+            self.keys.append(key)
+            self.masks.append(mask)
+            self.by_puzzle[(key, mask)].append(puzzle_id)
+            self.by_mask[mask].append(puzzle_id)
+        self.by_deletion = defaultdict(list)
+        for mask in self.by_mask:
+            for b in bits_of(mask):
+                self.by_deletion[mask & ~b].append(mask)
+
+    def __len__(self):
+        return len(self.masks)
+
+    # Same center, same letters: lists of puzzle ids, in order
+    def exact(self):
+        return [ids for ids in self.by_puzzle.values() if len(ids) > 1]
+
+    # Same letters under more than one center: mask -> {key letter: puzzle ids}
+    def center_swaps(self):
+        ret = {}
+        for mask, ids in self.by_mask.items():
+            by_key = defaultdict(list)
+            for i in ids:
+                by_key[self.keys[i]].append(i)
+            if len(by_key) > 1:
+                ret[mask] = dict(by_key)
+        return ret
+
+    # (a, b, removed bit, added bit) for every pair of distinct masks one letter apart
+    def near_masks(self):
+        for shared, masks in self.by_deletion.items():
+            for a, b in combinations(masks, 2):
+                yield a, b, a & ~shared, b & ~shared
+
+    # Number of near mask pairs, counted per bucket without listing them
+    def count_near_masks(self):
+        return sum(len(masks) * (len(masks) - 1) // 2 for masks in self.by_deletion.values())
+
+    # Every pair of puzzles one letter apart. `same_center` pairs keep the key letter, so only one
+    # non-center letter changed
+    def near_repeats(self, same_center_only=False):
+        for a, b, removed, added in self.near_masks():
+            for i in self.by_mask[a]:
+                for j in self.by_mask[b]:
+                    same_center = self.keys[i] == self.keys[j]
+                    if same_center or not same_center_only:
+                        yield NearRepeat(min(i, j), max(i, j), letter_of(removed if i < j else added),
+                                         letter_of(added if i < j else removed), same_center)
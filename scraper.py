@@ -1,20 +1,59 @@
+import json
 import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from urllib.parse import urlparse
 
-from bs4 import BeautifulSoup
-
-import requests
+from tqdm import tqdm
 
+import instrument
 import main
+from page_store import PageStore
 
 DIR = 'cache/'
+PAGES_FILE = DIR + 'pages.sqlite'
+PAGE_RECORDS_FILE = DIR + 'puzzle-pages.ndjson'
+# Point this at a local server to test the fetch pipeline offline
+BASE_URL = 'https://www.sbsolver.com'
+MAX_WORKERS = 8
+# Per host, so a full archive build stays polite
+REQUESTS_PER_SECOND = 5
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 1.0
+TIMEOUT_SECONDS = 30
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def puzzle_url(puzzle_id):
+    return f'{BASE_URL}/s/{puzzle_id}'
+
+
+def puzzle_id_from_url(url):
+    return int(url.rstrip('/').rsplit('/', 1)[1])
+
+
+# Always fetched fresh: the archive page is the one page that changes every day
+def latest_puzzle_id():
+    content = fetch(f'{BASE_URL}/archive', get_session(), RateLimiter())
+    if content is None:
+        raise Exception("Could not fetch the puzzle archive")
+    return max(int(puzzle_id) for puzzle_id in re.findall(rb'/s/(\d+)', content))
 
 
 def scrape_puzzle(url):
-    soup = get_soup(url)
-    words = [word_elem.get_text() for word_elem in soup.select('tr:not(.bee-disallowed) td.bee-hover')]
-    center = soup.select_one('td span.bee-center').get_text()
+    return puzzle_from_record(get_puzzle_page(url))
+
+
+def scrape_retconned_words(url):
+    return get_puzzle_page(url)['retconned']
+
+
+def puzzle_from_record(record):
+    words = record['allowed']
+    center = record['center']
     if not (words and center):
         raise Exception("Error in processing this puzzle")
     all_letters = set()
@@ -22,19 +61,68 @@ def scrape_puzzle(url):
         all_letters = all_letters.union(w)
         if len(all_letters) == 7:
             break
-    date_str = soup.select_one('.crumb').get_text().split(' | ')[0]
-    parsed_date = datetime.strptime(date_str, "%B %d, %Y")
+    parsed_date = datetime.strptime(record['date'], "%B %d, %Y")
 
     puzzle = main.Puzzle.of(center, all_letters)
     puzzle.all_words = words
     puzzle.date = parsed_date
+    puzzle.puzzle_id = puzzle_id_from_url(record['url'])
     return puzzle
 
 
-def scrape_retconned_words(url):
-    soup = get_soup(url)
-    words = [word_elem.get_text() for word_elem in soup.select('tr.bee-disallowed td.bee-hover')]
-    return words
+# Everything we use from an sbsolver puzzle page, from a single parse
+@instrument.timed('extract.page')
+def extract_puzzle_page(html_content):
+    soup = load_soup(html_content)
+    center = soup.select_one('td span.bee-center')
+    crumb = soup.select_one('.crumb')
+    return {
+        'allowed': [elem.get_text() for elem in soup.select('tr:not(.bee-disallowed) td.bee-hover')],
+        'retconned': [elem.get_text() for elem in soup.select('tr.bee-disallowed td.bee-hover')],
+        'center': center.get_text() if center else None,
+        'date': crumb.get_text().split(' | ')[0] if crumb else None,
+    }
+
+
+_page_records = None
+
+
+# Extracted records by url, persisted so a page's HTML is only ever parsed once
+def get_page_records():
+    global _page_records
+    if _page_records is None:
+        _page_records = {}
+        if os.path.exists(PAGE_RECORDS_FILE):
+            with open(PAGE_RECORDS_FILE, 'r') as infile:
+                for line in infile:
+                    record = json.loads(line)
+                    _page_records[record['url']] = record
+    return _page_records
+
+
+def get_puzzle_page(url):
+    return get_puzzle_pages([url])[0]
+
+
+# Records are appended to PAGE_RECORDS_FILE as each page is parsed, so an interrupted run keeps its progress
+def get_puzzle_pages(urls, progress=False):
+    urls = list(urls)
+    records = get_page_records()
+    missing = [url for url in dict.fromkeys(urls) if url not in records]
+    instrument.count('page_records.hit', len(urls) - len(missing))
+    instrument.count('page_records.miss', len(missing))
+    if missing:
+        os.makedirs(DIR, exist_ok=True)
+        with open(PAGE_RECORDS_FILE, 'a') as outfile:
+            for url in tqdm(missing) if progress else missing:
+                content = get_page(url)
+                if content is None:
+                    content = cache_url(url)
+                record = {'url': url, **extract_puzzle_page(content)}
+                records[url] = record
+                outfile.write(json.dumps(record) + '\n')
+                outfile.flush()
+    return [records[url] for url in urls]
 
 
 def scrape_pokedex():
@@ -84,29 +172,152 @@ def is_valid_name(name):
 
 
 def get_soup(url):
-    filename = filename_from_url(url)
-    filepath = DIR + filename
-    if not os.path.exists(filepath):
-        cache_url(url, filename)
-    return load_soup_from_file(filepath)
+    content = get_page(url)
+    if content is None:
+        instrument.count('get_soup.miss')
+        content = cache_url(url)
+    else:
+        instrument.count('get_soup.hit')
+    return load_soup(content)
 
 
-def load_soup_from_file(filepath):
-    with open(filepath, 'r', encoding='utf-8') as file:
-        html_content = file.read()
-    soup = BeautifulSoup(html_content, 'html.parser')
+def load_soup(html_content):
+    # Imported here so that tools which never parse HTML don't pay for bs4 at startup
+    from bs4 import BeautifulSoup
+    with instrument.stage('parse.bs4'):
+        soup = BeautifulSoup(html_content, 'html.parser')
     return soup
 
 
-def cache_url(url, filename):
-    response = requests.get(url)
-    filepath = DIR + filename
-    if response.status_code == 200:
-        with open(filepath, 'wb') as file:
-            file.write(response.content)
-        print(f"HTML response saved as '{filepath}'.")
-    else:
-        print(f"Failed to fetch HTML response from '{url}'. Status code: {response.status_code}")
+_page_store = None
+
+
+def get_page_store():
+    global _page_store
+    if _page_store is None:
+        os.makedirs(DIR, exist_ok=True)
+        _page_store = PageStore(PAGES_FILE)
+    return _page_store
+
+
+# Cached page bytes, or None. Pages from the old one-file-per-URL cache are moved into the store on first use
+def get_page(url):
+    store = get_page_store()
+    content = store.get(url)
+    if content is None:
+        legacy_path = DIR + filename_from_url(url)
+        if os.path.exists(legacy_path):
+            with open(legacy_path, 'rb') as file:
+                content = file.read()
+            store.put(url, content)
+            os.remove(legacy_path)
+    if content is not None:
+        instrument.count('bytes.read', len(content))
+    return content
+
+
+# Whether `url` is cached, without reading the page
+def has_page(url):
+    return url in get_page_store() or os.path.exists(DIR + filename_from_url(url))
+
+
+def cache_url(url):
+    content = fetch(url, get_session(), RateLimiter())
+    if content is None:
+        raise Exception(f"Could not fetch '{url}'")
+    get_page_store().put(url, content)
+    return content
+
+
+# Fetches every url that isn't cached yet on a bounded thread pool; returns the urls that failed
+def cache_urls(urls, workers=MAX_WORKERS, requests_per_second=REQUESTS_PER_SECOND):
+    missing = [url for url in urls if not has_page(url)]
+    if not missing:
+        return []
+    session = get_session(workers)
+    limiter = RateLimiter(requests_per_second)
+    failed = []
+
+    def fetch_one(url):
+        return url, fetch(url, session, limiter)
+
+    # Workers only fetch; pages are written from this thread as they arrive
+    def fetched_pages(results):
+        for url, content in results:
+            if content is None:
+                failed.append(url)
+            else:
+                yield url, content
+
+    with ThreadPoolExecutor(workers) as pool:
+        results = tqdm(pool.map(fetch_one, missing), total=len(missing), desc='Fetching')
+        get_page_store().put_many(fetched_pages(results))
+    if failed:
+        print(f'Failed to fetch {len(failed)} of {len(missing)} pages')
+    return failed
+
+
+class RateLimiter:
+    """Spaces out requests to the same host so they start at most `requests_per_second` apart."""
+
+    def __init__(self, requests_per_second=REQUESTS_PER_SECOND):
+        self.interval = 1.0 / requests_per_second
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        with instrument.stage('http.rate_limit'):
+            time.sleep(slot - now)
+
+
+_session = None
+_session_size = 0
+_session_lock = threading.Lock()
+
+
+# One pooled session per process, sized so every worker can keep its connection open; the pool grows
+# if a later caller asks for more workers
+def get_session(workers=MAX_WORKERS):
+    global _session, _session_size
+    import requests
+    from requests.adapters import HTTPAdapter
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        if workers > _session_size:
+            adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+            _session_size = workers
+    return _session
+
+
+# Page bytes, or None once the retries run out. Backs off exponentially on errors and 429/5xx
+def fetch(url, session, limiter):
+    import requests
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt:
+            time.sleep(BACKOFF_SECONDS * 2 ** (attempt - 1))
+        limiter.wait(url)
+        instrument.count('http.requests')
+        try:
+            with instrument.stage('http'):
+                response = session.get(url, timeout=TIMEOUT_SECONDS)
+        except requests.RequestException as e:
+            print(f"Error fetching '{url}': {e}")
+            continue
+        if response.status_code == 200:
+            instrument.count('bytes.fetched', len(response.content))
+            return response.content
+        if response.status_code not in RETRY_STATUS_CODES:
+            break
+    print(f"Failed to fetch HTML response from '{url}'.")
+    return None
 
 
 def create_cache():
@@ -0,0 +1,141 @@
+import heapq
+from collections import Counter, namedtuple
+
+import main
+from util import find_median
+from word_index import LETTER_BITS, WordIndex, is_valid_mask, letter_mask, mask_letters, submasks
+
+# `contains` are words (e.g. Pokémon names) that must all be answers
+Constraints = namedtuple('Constraints', ['min_words', 'max_words', 'perfect_pangram', 'valid', 'contains',
+                                         'min_median_frequency'],
+                         defaults=(0, None, False, True, (), None))
+Candidate = namedtuple('Candidate', ['key_letter', 'mask', 'n_words', 'n_pangrams'])
+
+
+def by_word_count(search, candidate):
+    return candidate.n_words
+
+
+def by_pangrams(search, candidate):
+    return candidate.n_pangrams
+
+
+def by_median_frequency(search, candidate):
+    return search.median_frequency(candidate)
+
+
+# Upper bounds on a score for every center of a letter set, as `bound(search, mask)`. They are taken for every
+# letter set, so they must be cheaper than `key_counts`. A score without one is computed for every candidate
+# that passes the constraints
+BOUNDS = {
+    by_word_count: lambda search, mask: search.total(mask),
+    by_pangrams: lambda search, mask: search.counts[mask],
+}
+
+
+class PuzzleSearch:
+    """Finds the best puzzles matching some Constraints without solving the whole puzzle space.
+
+    Words are reduced to per-mask counts once; a letter set's counts for all seven centers then
+    come from its 128 subsets. Letter sets are tried best bound first, and only those whose bound
+    can still make the top n get per-center counts. Cheap mask-level tests (validity, perfect
+    pangrams, required words, word count bounds) run before anything that needs the actual answers.
+    """
+
+    def __init__(self, words):
+        words = list(words)
+        self.index = WordIndex(words)
+        self.counts = Counter()
+        self.totals = {}
+        self.perfect_masks = set()
+        for mask, group in self.index.by_mask.items():
+            if len(mask_letters(mask)) <= 7:
+                self.counts[mask] = len(group)
+        for w in words:
+            if len(w) == 7 and len(set(w)) == 7:
+                self.perfect_masks.add(letter_mask(w))
+        self.pangram_masks = sorted(m for m in self.counts if len(mask_letters(m)) == 7)
+
+    # Words using only these letters, whatever the center; every center's answers are a subset of them
+    def total(self, mask):
+        if mask not in self.totals:
+            self.totals[mask] = sum(self.counts.get(sub, 0) for sub in submasks(mask))
+        return self.totals[mask]
+
+    # {key letter: words using only these letters that also use it}
+    def key_counts(self, mask):
+        per_key = dict.fromkeys(mask_letters(mask), 0)
+        for sub in submasks(mask):
+            n = self.counts.get(sub)
+            if n:
+                for c in mask_letters(sub):
+                    per_key[c] += n
+        return per_key
+
+    def words(self, candidate):
+        return self.index.solve(candidate.key_letter, mask_letters(candidate.mask))
+
+    def median_frequency(self, candidate):
+        return find_median(main.get_word_frequencies().lookup(self.words(candidate)).tolist())
+
+    def mask_allowed(self, mask, constraints):
+        if constraints.valid and not is_valid_mask(mask):
+            return False
+        if constraints.perfect_pangram and mask not in self.perfect_masks:
+            return False
+        return all(letter_mask(w) & ~mask == 0 for w in constraints.contains)
+
+    def key_allowed(self, key_letter, constraints):
+        return all(key_letter in w for w in constraints.contains)
+
+    # Every letter set that survives the mask-level tests
+    def candidates(self, constraints):
+        for mask in self.pangram_masks:
+            if not self.mask_allowed(mask, constraints):
+                continue
+            # Every center's answers include the pangrams
+            if constraints.max_words is not None and self.counts[mask] > constraints.max_words:
+                continue
+            if constraints.min_words and self.total(mask) < constraints.min_words:
+                continue
+            yield mask
+
+    # The `n` best Candidates by `score(search, candidate)`, best first. `bound` defaults to the score's entry in BOUNDS
+    def search(self, constraints=Constraints(), score=by_word_count, n=10, bound=None):
+        bound = bound or BOUNDS.get(score)
+        masks = list(self.candidates(constraints))
+        if bound is not None:
+            bounds = {mask: bound(self, mask) for mask in masks}
+            masks.sort(key=lambda m: -bounds[m])
+        best = []
+        for mask in masks:
+            # Nothing under this letter set can beat the worst of a full top-n. A tie still has to be looked at,
+            # since ties are ranked by key letter and mask
+            if bound is not None and len(best) == n and bounds[mask] < best[0][0]:
+                break
+            n_pangrams = self.counts[mask]
+            per_key = self.key_counts(mask)
+            for key_letter in sorted(per_key):
+                n_words = per_key[key_letter]
+                if n_words < constraints.min_words:
+                    continue
+                if constraints.max_words is not None and n_words > constraints.max_words:
+                    continue
+                if not self.key_allowed(key_letter, constraints):
+                    continue
+                candidate = Candidate(key_letter, mask, n_words, n_pangrams)
+                if constraints.min_median_frequency is not None and \
+                        self.median_frequency(candidate) < constraints.min_median_frequency:
+                    continue
+                entry = (score(self, candidate), -LETTER_BITS[key_letter], -mask, candidate)
+                if len(best) < n:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+        return [entry[-1] for entry in sorted(best, reverse=True)]
+
+    def puzzle(self, candidate):
+        puzzle = main.Puzzle.of(candidate.key_letter, mask_letters(candidate.mask))
+        puzzle.date = None
+        puzzle.solve(self.index)
+        return puzzle
@@ -0,0 +1,208 @@
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cache
+import main
+from batch import BatchSolver
+from trie import Trie
+from word_index import WordIndex
+
+HOST = '127.0.0.1'
+PORT = 8765
+# Latencies kept per endpoint for the percentiles in /metrics
+METRICS_WINDOW = 1000
+
+
+class LatencyMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.latencies = {}
+
+    def record(self, endpoint, seconds):
+        with self.lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+            self.latencies.setdefault(endpoint, deque(maxlen=METRICS_WINDOW)).append(seconds * 1000)
+
+    def summary(self):
+        with self.lock:
+            ret = {}
+            for endpoint, latencies in self.latencies.items():
+                ordered = sorted(latencies)
+                ret[endpoint] = {
+                    'requests': self.counts[endpoint],
+                    'mean_ms': sum(ordered) / len(ordered),
+                    'p50_ms': ordered[len(ordered) // 2],
+                    'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    'max_ms': ordered[-1],
+                }
+            return ret
+
+
+class SolveService:
+    """Everything a solve needs, loaded once and kept warm for the life of the process.
+
+    The word list is loaded up front; the frequency table and pokedex are loaded on first use
+    since they may need a download or a scrape.
+    """
+
+    def __init__(self, dictionary_names=('likely-words', 'verified-words')):
+        self.dictionary = cache.load_binary_dictionary(*dictionary_names)
+        words = list(self.dictionary)
+        self.solver = BatchSolver(words)
+        self.trie = Trie(words)
+        self.pokedex = None
+        self.frequencies = None
+        self.lock = threading.Lock()
+        self.metrics = LatencyMetrics()
+
+    def get_pokedex(self):
+        with self.lock:
+            if self.pokedex is None:
+                self.pokedex = WordIndex(cache.load_pokedex(), key=lambda p: p.name)
+            return self.pokedex
+
+    # main.get_word_frequencies is memoized but not locked, and its first call may download and write the table
+    def get_word_frequencies(self):
+        with self.lock:
+            if self.frequencies is None:
+                self.frequencies = main.get_word_frequencies()
+            return self.frequencies
+
+    # One vectorized pass for the whole batch
+    def solve(self, request):
+        puzzles = [main.Puzzle.of(p['key'], p['letters']) for p in request['puzzles']]
+        self.solver.solve_puzzles(puzzles)
+        if request.get('frequency'):
+            self.get_word_frequencies()
+        ret = []
+        for puzzle in puzzles:
+            result = {'puzzle': str(puzzle), 'words': sorted(puzzle.all_words), 'pangrams': sorted(puzzle.all_pangrams)}
+            if request.get('frequency'):
+                result['median_frequency'] = puzzle.median_word_frequency()
+            if request.get('grid'):
+                result['grid'] = puzzle.solution_grid()
+            ret.append(result)
+        return {'results': ret}
+
+    def hint(self, request):
+        puzzle = main.Puzzle.of(request['key'], request['letters'])
+        min_length = request.get('min_length', 4)
+        hints = puzzle.hints(self.trie, min_length)
+        grid = {}
+        for (first, length), count in hints['grid'].items():
+            grid.setdefault(first, {})[str(length)] = count
+        return {
+            'puzzle': str(puzzle),
+            'words': hints['words'],
+            'pangrams': hints['pangrams'],
+            'perfect_pangrams': hints['perfect_pangrams'],
+            'grid': grid,
+            'two_letter': dict(hints['two_letter']),
+            'text': puzzle.hint_grid(self.trie, min_length),
+        }
+
+    def pokedex(self, request):
+        puzzle = main.Puzzle.of(request['key'], request['letters'])
+        return {'puzzle': str(puzzle), 'markdown': puzzle.pokedex_markdown(self.get_pokedex())}
+
+
+class SolveRequestHandler(BaseHTTPRequestHandler):
+    POST_ENDPOINTS = {'/solve': SolveService.solve, '/hint': SolveService.hint, '/pokedex': SolveService.pokedex}
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == '/health':
+            self.send_json(200, {'status': 'ok', 'words': len(service.dictionary)})
+        elif self.path == '/metrics':
+            self.send_json(200, service.metrics.summary())
+        else:
+            self.send_json(404, {'error': f'Unknown endpoint {self.path}'})
+
+    def do_POST(self):
+        service = self.server.service
+        endpoint = self.POST_ENDPOINTS.get(self.path)
+        if endpoint is None:
+            self.send_json(404, {'error': f'Unknown endpoint {self.path}'})
+            return
+        start = time.perf_counter()
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            response = endpoint(service, request)
+        except (KeyError, ValueError, TypeError) as e:
+            self.send_json(400, {'error': f'Bad request: {e!r}'})
+            return
+        service.metrics.record(self.path, time.perf_counter() - start)
+        self.send_json(200, response)
+
+    def send_json(self, status, body):
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(service, host=HOST, port=PORT):
+    server = ThreadingHTTPServer((host, port), SolveRequestHandler)
+    server.service = service
+    return server
+
+
+class SolveClient:
+    """Thin JSON client for a running server; also what we test the server with."""
+
+    def __init__(self, host=HOST, port=PORT, timeout=30):
+        self.url = f'http://{host}:{port}'
+        self.timeout = timeout
+
+    def request(self, path, body=None):
+        data = None if body is None else json.dumps(body).encode('utf-8')
+        request = urllib.request.Request(self.url + path, data=data, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    # `puzzles` are (key letter, other letters) pairs, solved in one batch
+    def solve(self, puzzles, grid=False, frequency=False):
+        body = {'puzzles': [{'key': k, 'letters': ''.join(l)} for k, l in puzzles], 'grid': grid, 'frequency': frequency}
+        return self.request('/solve', body)['results']
+
+    def hint(self, key, letters, min_length=4):
+        return self.request('/hint', {'key': key, 'letters': ''.join(letters), 'min_length': min_length})
+
+    def pokedex(self, key, letters):
+        return self.request('/pokedex', {'key': key, 'letters': ''.join(letters)})['markdown']
+
+    def metrics(self):
+        return self.request('/metrics')
+
+    def health(self):
+        return self.request('/health')
+
+
+def serve():
+    parser = argparse.ArgumentParser(description='Keep the word indexes warm and answer solve/hint/pokedex requests.')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    args = parser.parse_args()
+    server = make_server(SolveService(), args.host, args.port)
+    print(f'Serving on http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    serve()
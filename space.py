@@ -0,0 +1,173 @@
+import os
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+from tqdm import tqdm
+
+import cache
+import main
+import scraper
+from word_index import LETTER_BITS, is_valid_mask, letter_mask, mask_letters
+
+# One row per (key letter, letter set) puzzle
+RESULT_DTYPE = np.dtype([
+    ('key', np.uint32),
+    ('mask', np.uint32),
+    ('n_words', np.uint32),
+    ('n_pangrams', np.uint32),
+    ('median_length', np.float32),
+    ('median_frequency', np.float32),
+])
+CHUNK_SIZE = 512
+SPACE_FILE = 'puzzle-space.npy'
+
+# Read-only views on the shared word index, set up once per worker by `attach_index`
+_shared = {}
+
+
+class SharedWordIndex:
+    """Word masks, lengths and frequencies laid out in shared memory, grouped by letter mask.
+
+    `unique_masks[i]` owns the words `starts[i]:starts[i + 1]` of `lengths` and `frequencies`,
+    so workers can solve a puzzle with 64 binary searches and never see a Python string.
+    """
+    FIELDS = ('unique_masks', 'starts', 'lengths', 'frequencies')
+
+    def __init__(self, words, frequencies):
+        masks = np.array([letter_mask(w) for w in words], dtype=np.uint32)
+        order = np.argsort(masks, kind='stable')
+        masks = masks[order]
+        unique_masks, starts = np.unique(masks, return_index=True)
+        arrays = {
+            'unique_masks': unique_masks,
+            'starts': np.append(starts, len(masks)).astype(np.int64),
+            'lengths': np.array([len(w) for w in words], dtype=np.uint8)[order],
+            'frequencies': np.asarray(frequencies, dtype=np.float32)[order],
+        }
+        self.blocks = {}
+        self.specs = {}
+        for name in self.FIELDS:
+            array = arrays[name]
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            self.blocks[name] = block
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+
+
+def attach_index(specs):
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _shared[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        # Keep the block alive as long as the view
+        _shared[name + '_block'] = block
+
+
+# Each row of SUBSET_SELECTORS picks a different subset of the 6 non-key letters
+SUBSET_SELECTORS = (np.arange(64)[:, None] >> np.arange(6)) & 1
+
+
+def score_puzzle(key_bit, mask):
+    other_bits = np.array([b for b in LETTER_BITS.values() if mask & b and b != key_bit], dtype=np.int64)
+    subsets = SUBSET_SELECTORS[:, :len(other_bits)] @ other_bits + key_bit
+    unique_masks = _shared['unique_masks']
+    starts = _shared['starts']
+    positions = np.minimum(np.searchsorted(unique_masks, subsets), len(unique_masks) - 1)
+    found = unique_masks[positions] == subsets
+    positions, subsets = positions[found], subsets[found]
+    if not len(positions):
+        return 0, 0, np.nan, np.nan
+    word_ids = np.concatenate([np.arange(starts[p], starts[p + 1]) for p in positions])
+    n_pangrams = sum(starts[p + 1] - starts[p] for p, s in zip(positions, subsets) if s == mask)
+    return (len(word_ids), n_pangrams, np.median(_shared['lengths'][word_ids]),
+            np.median(_shared['frequencies'][word_ids]))
+
+
+def score_chunk(chunk):
+    rows = np.zeros(len(chunk), dtype=RESULT_DTYPE)
+    for i, (key_bit, mask) in enumerate(chunk):
+        rows[i] = (key_bit, mask, *score_puzzle(int(key_bit), int(mask)))
+    return rows
+
+
+class PuzzleSpace:
+    """Lazily yields every (key letter, letter mask) puzzle that has a pangram in `dictionary`.
+
+    Pangram letter sets are deduplicated as masks before any puzzle is made, and only the masks
+    are kept, so memory grows with the number of distinct letter sets rather than puzzles.
+    `n_valid` and `n_invalid` count puzzles seen so far, whether or not they were yielded.
+    """
+
+    def __init__(self, dictionary, include_invalid=False):
+        self.dictionary = dictionary
+        self.include_invalid = include_invalid
+        self.n_valid = 0
+        self.n_invalid = 0
+
+    def __iter__(self):
+        seen = set()
+        for w in self.dictionary:
+            if len(set(w)) != 7:
+                continue
+            mask = letter_mask(w)
+            if mask in seen:
+                continue
+            seen.add(mask)
+            letters = mask_letters(mask)
+            if is_valid_mask(mask):
+                self.n_valid += len(letters)
+            else:
+                self.n_invalid += len(letters)
+                if not self.include_invalid:
+                    continue
+            for key in letters:
+                yield key, mask
+
+
+# (valid, invalid) puzzle counts, i.e. the README's 52,729 / 97,841 for the scrabble dictionary
+def count_puzzles(dictionary):
+    space = PuzzleSpace(dictionary, include_invalid=True)
+    for _ in space:
+        pass
+    return space.n_valid, space.n_invalid
+
+
+def puzzle_array(pairs):
+    return np.array([(LETTER_BITS[key], mask) for key, mask in pairs], dtype=np.uint32)
+
+
+def solve_space(dictionary, filepath=None, workers=None):
+    filepath = filepath or cache.DIR + SPACE_FILE
+    words = sorted(dictionary)
+    frequencies = main.get_word_frequencies().lookup(words)
+    puzzles = puzzle_array(PuzzleSpace(words))
+    chunks = [puzzles[i:i + CHUNK_SIZE] for i in range(0, len(puzzles), CHUNK_SIZE)]
+    index = SharedWordIndex(words, frequencies)
+    scraper.create_cache()
+    try:
+        table = np.lib.format.open_memmap(filepath, mode='w+', dtype=RESULT_DTYPE, shape=(len(puzzles),))
+        offset = 0
+        with Pool(workers or os.cpu_count(), initializer=attach_index, initargs=(index.specs,)) as pool:
+            # imap keeps chunk order, so each result lands right after the previous one
+            for rows in tqdm(pool.imap(score_chunk, chunks), total=len(chunks)):
+                table[offset:offset + len(rows)] = rows
+                offset += len(rows)
+        table.flush()
+    finally:
+        index.close()
+    return load_space(filepath)
+
+
+def load_space(filepath=None):
+    return np.load(filepath or cache.DIR + SPACE_FILE, mmap_mode='r')
+
+
+def top_puzzles(table, field, n=10, reverse=True):
+    order = np.argsort(table[field], kind='stable')
+    if reverse:
+        order = order[::-1]
+    return [main.Puzzle.of(mask_letters(row['key'])[0], mask_letters(row['mask'])) for row in table[order[:n]]]
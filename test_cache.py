@@ -0,0 +1,93 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import archive
+import cache
+import main
+import scraper
+
+WORDS = ['ABCDEFG', 'BADGE', 'CAGED']
+
+
+def puzzle_date(puzzle_id):
+    return date(2018, 5, 8) + timedelta(days=puzzle_id)
+
+
+# Stand-in for sbsolver: /archive links puzzles 1 to `server.latest`, and every puzzle has the same answers
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits.append(self.path)
+        if self.path == '/archive':
+            body = ''.join(f'<a href="/s/{i}">{i}</a>' for i in range(1, server.latest + 1))
+        else:
+            crumb = f'{puzzle_date(int(self.path.rsplit("/", 1)[1])):%B %d, %Y} | Puzzle'
+            rows = ''.join(f'<tr><td class="bee-hover">{w}</td></tr>' for w in WORDS)
+            body = (f'<html><div class="crumb">{crumb}</div>'
+                    f'<table><tr><td><span class="bee-center">A</span></td></tr>{rows}</table></html>')
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def stored_puzzle(puzzle_id):
+    puzzle = main.Puzzle.of('A', WORDS[0])
+    puzzle.all_words = WORDS
+    puzzle.calc_pangrams()
+    puzzle.date = puzzle_date(puzzle_id)
+    puzzle.puzzle_id = puzzle_id
+    return puzzle
+
+
+class UpdatePuzzlesTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.lock = threading.Lock()
+        self.server.hits = []
+        self.server.latest = 5
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = scraper.BASE_URL
+        scraper.BASE_URL = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpdir.name)
+        scraper._page_store = None
+        scraper._page_records = None
+
+    def tearDown(self):
+        if scraper._page_store is not None:
+            scraper._page_store.conn.close()
+        scraper._page_store = None
+        scraper._page_records = None
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+        scraper.BASE_URL = self.base_url
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_fills_gaps_and_fetches_new_puzzles_once(self):
+        os.makedirs(cache.DIR, exist_ok=True)
+        archive.save_archive([stored_puzzle(i) for i in (5, 4, 2, 1)], cache.PUZZLES_FILE)
+        self.server.latest = 6
+        cache.update_puzzles()
+        ids = [r['puzzle_id'] for r in archive.iter_records(cache.PUZZLES_FILE, ('puzzle_id',))]
+        self.assertEqual(sorted(ids), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(sorted(p for p in self.server.hits if p.startswith('/s/')), ['/s/3', '/s/6'])
+
+        self.server.hits.clear()
+        self.assertEqual(cache.update_puzzles(), [])
+        self.assertEqual(self.server.hits, ['/archive'])
+
+
+if __name__ == '__main__':
+    unittest.main()
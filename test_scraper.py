@@ -0,0 +1,85 @@
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import scraper
+
+
+# Stand-in for sbsolver: /flaky/<n> fails with 503 until its n-th request, /missing is a 404
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            server.times.append(time.monotonic())
+            hits = server.hits[self.path]
+        if self.path == '/missing':
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.path.startswith('/flaky/') and hits < int(self.path.rsplit('/', 1)[1]):
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = f'<html>{self.path}</html>'.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FetchTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.lock = threading.Lock()
+        self.server.hits = {}
+        self.server.times = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.backoff_seconds = scraper.BACKOFF_SECONDS
+        scraper.BACKOFF_SECONDS = 0.01
+
+    def tearDown(self):
+        scraper.BACKOFF_SECONDS = self.backoff_seconds
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_retries_until_success(self):
+        content = scraper.fetch(self.base_url + '/flaky/3', scraper.get_session(), scraper.RateLimiter(1000))
+        self.assertEqual(content, b'<html>/flaky/3</html>')
+        self.assertEqual(self.server.hits['/flaky/3'], 3)
+
+    def test_gives_up_after_max_retries(self):
+        url = f'{self.base_url}/flaky/{scraper.MAX_RETRIES + 5}'
+        self.assertIsNone(scraper.fetch(url, scraper.get_session(), scraper.RateLimiter(1000)))
+        self.assertEqual(sum(self.server.hits.values()), scraper.MAX_RETRIES + 1)
+
+    def test_does_not_retry_client_errors(self):
+        self.assertIsNone(scraper.fetch(self.base_url + '/missing', scraper.get_session(), scraper.RateLimiter(1000)))
+        self.assertEqual(self.server.hits['/missing'], 1)
+
+    def test_rate_limit_spaces_out_concurrent_requests(self):
+        limiter = scraper.RateLimiter(20)
+        session = scraper.get_session(4)
+        threads = [threading.Thread(target=scraper.fetch, args=(f'{self.base_url}/page/{i}', session, limiter))
+                   for i in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        times = sorted(self.server.times)
+        self.assertEqual(len(times), 6)
+        # 5 gaps of 1/20s, with a little slack for scheduling
+        self.assertGreaterEqual(times[-1] - times[0], 5 * 0.05 * 0.9)
+
+    def test_session_pool_grows_with_workers(self):
+        session = scraper.get_session(scraper.MAX_WORKERS * 2)
+        self.assertEqual(session.get_adapter(self.base_url)._pool_maxsize, scraper.MAX_WORKERS * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import random
+import unittest
+
+import main
+from search import Constraints, PuzzleSearch, by_pangrams, by_word_count
+from word_index import LETTER_BITS, WordIndex, is_valid_mask, mask_letters
+
+# A small alphabet, so letter sets share a lot of words and many scores tie
+LETTERS = 'ABCDEGHILNORT'
+
+
+def random_words(n, seed):
+    rng = random.Random(seed)
+    return sorted({''.join(rng.choices(LETTERS, k=rng.randint(4, 9))) for _ in range(n)})
+
+
+# (n_words, n_pangrams, key letter, mask) for every puzzle, solved outright rather than from per-mask counts
+def solve_all(finder, words):
+    index = WordIndex(words)
+    ret = []
+    for mask in finder.pangram_masks:
+        for key in mask_letters(mask):
+            puzzle = main.Puzzle.of(key, mask_letters(mask))
+            puzzle.solve(index)
+            ret.append((len(puzzle.all_words), len(puzzle.all_pangrams), key, mask))
+    return ret
+
+
+# The top `n` of `solved`, ranked the way PuzzleSearch ranks them
+def brute_force(solved, constraints, score, n):
+    ranked = []
+    for n_words, n_pangrams, key, mask in solved:
+        if constraints.valid and not is_valid_mask(mask):
+            continue
+        if n_words < constraints.min_words:
+            continue
+        if constraints.max_words is not None and n_words > constraints.max_words:
+            continue
+        value = n_words if score is by_word_count else n_pangrams
+        ranked.append((value, -LETTER_BITS[key], -mask, key, mask))
+    ranked.sort(reverse=True)
+    return [(key, mask) for *_, key, mask in ranked[:n]]
+
+
+class PuzzleSearchTest(unittest.TestCase):
+    def test_matches_brute_force(self):
+        for seed in range(3):
+            words = random_words(3000, seed)
+            finder = PuzzleSearch(words)
+            solved = solve_all(finder, words)
+            for constraints in (Constraints(), Constraints(min_words=10, max_words=20),
+                                Constraints(min_words=5, valid=False)):
+                for score in (by_word_count, by_pangrams):
+                    for n in (1, 5):
+                        found = [(c.key_letter, c.mask) for c in finder.search(constraints, score, n)]
+                        self.assertEqual(found, brute_force(solved, constraints, score, n),
+                                         (seed, constraints, score.__name__, n))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+
+import main
+import server
+
+WORDS = ['ABCDEFG', 'BADGE', 'CAGED', 'DECADE', 'FACE', 'GAFFE', 'HIJACK', 'CHICK', 'JACK', 'HACK']
+PUZZLES = [('A', 'BCDEFG'), ('C', 'AHIJKE'), ('K', 'ACHIJE')]
+
+
+class SolveServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cwd = os.getcwd()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(cls.tmpdir.name)
+        os.makedirs('cache', exist_ok=True)
+        with open('test-words.txt', 'w') as outfile:
+            outfile.write('\n'.join(WORDS))
+        cls.server = server.make_server(server.SolveService(('test-words',)), port=0)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.client = server.SolveClient(port=cls.server.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        os.chdir(cls.cwd)
+        cls.tmpdir.cleanup()
+
+    def expected(self, key, letters):
+        puzzle = main.Puzzle.of(key, letters)
+        puzzle.solve(WORDS)
+        return puzzle
+
+    def test_solve_batch_matches_puzzle_solve(self):
+        results = self.client.solve(PUZZLES)
+        self.assertEqual(len(results), len(PUZZLES))
+        for (key, letters), result in zip(PUZZLES, results):
+            puzzle = self.expected(key, letters)
+            self.assertEqual(result['puzzle'], str(puzzle))
+            self.assertEqual(result['words'], sorted(puzzle.all_words))
+            self.assertEqual(result['pangrams'], sorted(puzzle.all_pangrams))
+
+    def test_hint_counts(self):
+        puzzle = self.expected('A', 'BCDEFG')
+        hint = self.client.hint('A', 'BCDEFG')
+        self.assertEqual(hint['words'], len(puzzle.all_words))
+        self.assertEqual(hint['pangrams'], len(puzzle.all_pangrams))
+        self.assertEqual(sum(n for row in hint['grid'].values() for n in row.values()), len(puzzle.all_words))
+
+    def test_bad_requests_are_400s(self):
+        for path, body in [('/solve', {'puzzles': [{'key': 'A'}]}), ('/hint', {'letters': 'BCDEFG'}),
+                           ('/solve', {'puzzles': [{'key': '?', 'letters': 'BCDEFG'}]})]:
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                self.client.request(path, body)
+            self.assertEqual(raised.exception.code, 400)
+
+    def test_metrics_count_successful_requests(self):
+        before = self.client.metrics()
+        self.client.solve(PUZZLES[:1])
+        self.client.solve(PUZZLES)
+        self.client.hint('A', 'BCDEFG')
+        with self.assertRaises(urllib.error.HTTPError):
+            self.client.request('/hint', {})
+        after = self.client.metrics()
+
+        def requests(metrics, path):
+            return metrics.get(path, {}).get('requests', 0)
+
+        self.assertEqual(requests(after, '/solve') - requests(before, '/solve'), 2)
+        self.assertEqual(requests(after, '/hint') - requests(before, '/hint'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+from collections import Counter
+
+from word_index import LETTER_BITS, letter_mask
+
+
+class Trie:
+    """Prefix tree over a word list, stored as parallel lists indexed by node id (0 is the root).
+
+    Traversals are constrained to a set of letters, so whole branches that use a letter outside
+    the puzzle are never visited.
+    """
+
+    def __init__(self, words=()):
+        self.children = [{}]
+        self.is_word = [False]
+        self.size = 0
+        for w in words:
+            self.add(w)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, word):
+        node = self.find(word)
+        return node is not None and self.is_word[node]
+
+    def add(self, word):
+        node = 0
+        for c in word:
+            child = self.children[node].get(c)
+            if child is None:
+                child = len(self.children)
+                self.children[node][c] = child
+                self.children.append({})
+                self.is_word.append(False)
+            node = child
+        if not self.is_word[node]:
+            self.is_word[node] = True
+            self.size += 1
+
+    def find(self, prefix):
+        node = 0
+        for c in prefix:
+            node = self.children[node].get(c)
+            if node is None:
+                return None
+        return node
+
+    # Depth-first over branches spelled only with `letters`; yields (prefix, letter mask) for each word
+    def walk(self, letters, min_length=1):
+        allowed = set(letters)
+        stack = [(0, '', 0)]
+        while stack:
+            node, prefix, mask = stack.pop()
+            if self.is_word[node] and len(prefix) >= min_length:
+                yield prefix, mask
+            for c, child in self.children[node].items():
+                if c in allowed:
+                    stack.append((child, prefix + c, mask | LETTER_BITS[c]))
+
+    def words_using(self, letters, min_length=1):
+        return sorted(prefix for prefix, _ in self.walk(letters, min_length))
+
+    # NYT-style hint tables for one puzzle, counted during the walk rather than from a solved word list
+    def hint_counts(self, key_letter, letters, min_length=4):
+        key_bit = LETTER_BITS[key_letter]
+        all_mask = letter_mask(letters) | key_bit
+        grid = Counter()
+        two_letter = Counter()
+        n_words = n_pangrams = n_perfect = 0
+        for prefix, mask in self.walk(set(letters) | {key_letter}, min_length):
+            if not mask & key_bit:
+                continue
+            n_words += 1
+            grid[(prefix[0], len(prefix))] += 1
+            two_letter[prefix[:2]] += 1
+            if mask == all_mask:
+                n_pangrams += 1
+                if len(prefix) == 7:
+                    n_perfect += 1
+        return {
+            'words': n_words,
+            'pangrams': n_pangrams,
+            'perfect_pangrams': n_perfect,
+            'grid': grid,
+            'two_letter': two_letter,
+        }
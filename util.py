@@ -22,6 +22,33 @@ def surround(first_column, two_d_list, last_column):
     return [[cell1] + row + [cell2] for cell1, row, cell2 in zip(first_column, two_d_list, last_column)]
 
 
+# One pass over `words`: (first letter, length) -> the words there, each list in sorted order
+def group_by_first_and_length(words):
+    groups = {}
+    for w in sorted(words):
+        groups.setdefault((w[0], len(w)), []).append(w)
+    return groups
+
+
+# The first letter x length table every grid renderer shares: header, one row per first letter and a Σ footer.
+# `counts` maps (first letter, length) to a count; `cell` turns a key into what's shown (the count, blank if 0, by default)
+def first_length_grid(counts, cell=None):
+    first_sums = {}
+    length_sums = {}
+    for (f, l), n in counts.items():
+        first_sums[f] = first_sums.get(f, 0) + n
+        length_sums[l] = length_sums.get(l, 0) + n
+    all_firsts = sorted(first_sums)
+    all_lengths = sorted(length_sums)
+    if cell is None:
+        def cell(key):
+            return counts.get(key) or ''
+    rows = [[cell((f, l)) for l in all_lengths] for f in all_firsts]
+    header = ['', *all_lengths, 'Σ']
+    footer = ['Σ', *(length_sums[l] for l in all_lengths), sum(length_sums.values())]
+    return [header] + surround(all_firsts, rows, [first_sums[f] for f in all_firsts]) + [footer]
+
+
 def find_median(lst):
     sorted_lst = sorted(lst)
     n = len(sorted_lst)
@@ -34,29 +61,25 @@ def find_median(lst):
 
 
 def grid_str(values):
-    string_values = [[str(cell) for cell in row] for row in values]
-    rotated = zip(*string_values)
-    column_widths = [max([max([len(w) for w in cell.split('\n')] + [0]) for cell in col]) for col in rotated]
-    row_heights = [max([max([len(cell.split('\n'))]) for cell in row] + [0]) for row in string_values]
-    string_builder = ''
-    for i, row in enumerate(string_values):
-        # Fill extra row things
-        sub_rows = [['' for _ in row] for _ in range(row_heights[i])]
-        for i2, cell in enumerate(row):
-            sub_cells = cell.split('\n')
-            for j2, s_cell in enumerate(sub_cells):
-                sub_rows[j2][i2] = s_cell
-        string_builder += '\n'.join([get_row_text(sub_row, column_widths) for sub_row in sub_rows]) + '\n'
-        if i != len(string_values) - 1:
-            string_builder += get_divider(column_widths) + '\n'
-    return string_builder
-
-
+    # Every cell split into its lines once
+    split_rows = [[str(cell).split('\n') for cell in row] for row in values]
+    column_widths = [max([len(line) for cell in col for line in cell] + [0]) for col in zip(*split_rows)]
+    divider = get_divider(column_widths)
+    lines = []
+    for i, row in enumerate(split_rows):
+        if i:
+            lines.append(divider)
+        # Multi-line cells make the row taller; shorter cells are padded with blank lines
+        for j in range(max([len(cell) for cell in row] + [0])):
+            lines.append(get_row_text([cell[j] if j < len(cell) else '' for cell in row], column_widths))
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+# Leaves `matrix` as it was; the alignment row is added to the output only
 def markdown_table(matrix):
     header_line = [':-:' for _ in matrix[0]]
-    matrix.insert(1, header_line)
-    cells = '\n'.join(['| ' + ' | '.join([str(cell) for cell in row]) + ' |' for row in matrix])
-    return cells
+    return '\n'.join('| ' + ' | '.join([str(cell) for cell in row]) + ' |'
+                     for row in [matrix[0], header_line, *matrix[1:]])
 
 
 def get_row_text(row, widths):
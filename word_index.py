@@ -0,0 +1,112 @@
+import string
+import threading
+from array import array
+
+ALPHABET = string.ascii_uppercase
+LETTER_BITS = {c: 1 << i for i, c in enumerate(ALPHABET)}
+S_BIT = LETTER_BITS['S']
+ER_BITS = LETTER_BITS['E'] | LETTER_BITS['R']
+
+
+# 'CAB' -> 0b111, one bit per distinct letter
+def letter_mask(letters):
+    mask = 0
+    for c in letters:
+        mask |= LETTER_BITS[c]
+    return mask
+
+
+def mask_letters(mask):
+    return [c for c in ALPHABET if mask & LETTER_BITS[c]]
+
+
+# Puzzle.is_valid as bit tests: no S, and not both E and R
+def is_valid_mask(mask):
+    return not mask & S_BIT and mask & ER_BITS != ER_BITS
+
+
+# Every subset of `mask` that still has all the bits of `required`
+def submasks(mask, required=0):
+    free = mask & ~required
+    sub = free
+    while True:
+        yield sub | required
+        if sub == 0:
+            break
+        sub = (sub - 1) & free
+
+
+class WordIndex:
+    """Groups words by the set of distinct letters they use, stored as a 26-bit mask.
+
+    `key` turns an item into its word, so the index can hold things other than strings
+    (e.g. PokedexEntry objects keyed by name).
+    """
+
+    def __init__(self, items=(), key=None):
+        self.key = key
+        self.by_mask = {}
+        self.size = 0
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for group in self.by_mask.values():
+            yield from group
+
+    def word_of(self, item):
+        return item if self.key is None else self.key(item)
+
+    def add(self, item):
+        mask = letter_mask(self.word_of(item))
+        self.by_mask.setdefault(mask, []).append(item)
+        self.size += 1
+
+    # At most 64 lookups for a 7-letter puzzle
+    def solve(self, key_letter, letters):
+        ret = []
+        for sub in submasks(letter_mask(letters), LETTER_BITS[key_letter]):
+            ret.extend(self.by_mask.get(sub, []))
+        return ret
+
+    def pangrams(self, letters):
+        return list(self.by_mask.get(letter_mask(letters), []))
+
+
+class WordIds:
+    """Interns words as small integer ids so puzzles can share one copy of every answer.
+
+    Safe to share between threads (e.g. the server's request handlers): new ids are handed out under a lock.
+    """
+
+    def __init__(self):
+        self.words = []
+        self.ids = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.words)
+
+    def id_of(self, word):
+        word_id = self.ids.get(word)
+        if word_id is None:
+            with self.lock:
+                # Another thread may have added it since the unlocked lookup
+                word_id = self.ids.get(word)
+                if word_id is None:
+                    self.words.append(word)
+                    word_id = self.ids[word] = len(self.words) - 1
+        return word_id
+
+    def ids_of(self, words):
+        return array('I', [self.id_of(w) for w in words])
+
+    def words_of(self, word_ids):
+        return [self.words[i] for i in word_ids]
+
+
+# Shared by every Puzzle in the process
+WORD_IDS = WordIds()